@@ -1,23 +1,26 @@
+from startup import profile
+
 import asyncio
+import json
 import logging
-from typing import Dict, Any
-from aiogram import Bot, Dispatcher, F, Router
+from typing import Dict, Any, List
+from aiogram import Dispatcher, F, Router
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, StateFilter,CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
 import re
+import time
 
-from config import BOT_TOKEN,ADMIN_IDS
-from texts import (WELCOME_TEXT, HELP_TEXT,SEGMENT_MESSAGES, CASE_STUDIES, 
-                   FAQ_ANSWERS,HOW_IT_WORKS_TEXT,CASE_STUDIES_HANDLER_TEXT,FAQ_HANDLER_TEXT,
-                   GET_TEMPLATE_TEXT,ORDER_DEMO_TEXT,ACTION_TEMPLATE_TEXT,ACTION_DEMO_TEXT,EXIT_TEXT)
+from config import FUNNEL_FLUSH_INTERVAL, FSM_STORAGE, WORKERS, STARTUP_BENCH
 from keyboards import (
     get_segment_keyboard, get_main_menu_keyboard, get_case_studies_keyboard,
-    get_faq_keyboard, get_back_keyboard
+    get_faq_keyboard, get_back_keyboard, get_lead_status_keyboard, LEAD_STATUSES
 )
-from google_sheets import init_google_sheets, save_lead_to_sheets, get_leads_statistics
+from funnel import format_report
+from tenant import Tenant, TenantMiddleware, load_tenants
 
 
 logging.basicConfig(level=logging.INFO)
@@ -29,71 +32,85 @@ class UserStates(StatesGroup):
     waiting_for_phone = State()
 
 
-bot = Bot(token=BOT_TOKEN)
-storage = MemoryStorage()
+def create_storage():
+    """FSM-хранилище: в памяти или Redis (нужен пакет redis)"""
+    if FSM_STORAGE.startswith('redis://'):
+        from aiogram.fsm.storage.redis import RedisStorage
+        return RedisStorage.from_url(FSM_STORAGE)
+    return MemoryStorage()
+
+
+# Хранилище общее для всех ботов, ключи FSM уже содержат bot_id
+storage = create_storage()
 dp = Dispatcher(storage=storage)
 router = Router()
 
-# db :) нужно поменять на psql
-user_data: Dict[int, Dict[str, Any]] = {}
+
+@dp.update.outer_middleware()
+async def first_update_middleware(handler, event, data):
+    profile.mark_first_update()
+    return await handler(event, data)
 
 
 @router.message(CommandStart())
-async def start_handler(message: Message):
+async def start_handler(message: Message, tenant: Tenant):
     user_id = message.from_user.id
-    user_data[user_id] = {
+    tenant.user_data[user_id] = {
         'user_id': user_id,
         'username': message.from_user.username,
         'first_name': message.from_user.first_name,
         'started_at': message.date.isoformat()
     }
+    tenant.track(user_id, 'start')
+    
+    try:
+        await tenant.media.send(tenant.bot, message.chat.id, 'welcome')
+    except Exception as e:
+        logger.error(f"Error sending welcome image: {e}")
     
     await message.answer(
-        WELCOME_TEXT,
-        reply_markup=get_segment_keyboard(),
+        tenant.texts.WELCOME_TEXT,
+        reply_markup=get_segment_keyboard(tenant.texts),
         parse_mode='HTML'
     )
 
 @router.message(Command("help"))
-async def help_handler(message: Message):
+async def help_handler(message: Message, tenant: Tenant):
     """ команда /help """
-    await message.answer(HELP_TEXT, parse_mode='HTML')
+    await message.answer(tenant.texts.HELP_TEXT, parse_mode='HTML')
     
 
 @router.message(Command("stats"))
-async def stats_handler(message: Message):
+async def stats_handler(message: Message, tenant: Tenant):
     """Показать статистику лидов, только для админов"""
-    admin_ids = ADMIN_IDS
-    
-    if message.from_user.id not in admin_ids:
+    if not tenant.is_admin(message.from_user.id):
         await message.answer("❌ У вас нет доступа к статистике.")
         return
     
     try:
         # Dict[str,dict[str,int]]
-        stats = await get_leads_statistics()
+        stats = await tenant.sheets.get_statistics()
         if stats:
-            text = f"""📊 <b>Статистика лидов SignContract</b>
+            text = f"""{tenant.texts.STATS_TITLE}
 
 📈 <b>Общее количество лидов:</b> {stats['total_leads']}
 
 👥 <b>По сегментам:</b>
 """
             for segment, count in stats['by_segment'].items():
-                # dict[str,emoji:)]
-                # for each segment we get emoji
-                emoji = {'ip': '👨‍💼', 'lawyer': '⚖️', 'hr': '👥', 'other': '🔄'}.get(segment, '❓')
-                
-                segment_name = {'ip': 'Индивидуальный Предприниматель', 'lawyer': 'Юристы', 'hr': 'HR', 'other': 'Другие'}.get(segment, segment)
-
+                # подписи сегментов и действий свои у каждого бота
+                emoji, segment_name = tenant.texts.SEGMENT_LABELS.get(segment, ('❓', segment))
                 text += f"{emoji} {segment_name}: {count}\n"
             
             text += f"\n🎯 <b>По действиям:</b>\n"
             for action, count in stats['by_action'].items():
-                emoji = {'template': '📄', 'demo': '🎯'}.get(action, '❓')
-                action_name = {'template': 'Шаблоны', 'demo': 'Демо'}.get(action, action)
+                emoji, action_name = tenant.texts.ACTION_LABELS.get(action, ('❓', action))
                 text += f"{emoji} {action_name}: {count}\n"
             
+            if stats.get('stale'):
+                updated_at = stats['updated_at'].strftime('%Y-%m-%d %H:%M')
+                text += f"\n⚠️ <i>Google Sheets недоступен, данные на {updated_at}</i>"
+            
             await message.answer(text, parse_mode='HTML')
         else:
             await message.answer("❌ Не удалось получить статистику.")
@@ -102,116 +119,217 @@ async def stats_handler(message: Message):
         logger.error(f"Error getting stats: {e}")
         await message.answer("❌ Ошибка при получении статистики.")
 
+@router.message(Command("funnel"))
+async def funnel_handler(message: Message, tenant: Tenant):
+    """Конверсия воронки по сегментам, только для админов
+
+    /funnel [дней] [day|week]
+    """
+    if not tenant.is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет доступа к статистике.")
+        return
+    
+    args = (message.text or "").split()[1:]
+    days = int(args[0]) if args and args[0].isdigit() else 7
+    bucket = 7 * 86400 if len(args) > 1 and args[1] == 'week' else 86400
+    
+    try:
+        since = int(time.time()) - days * 86400
+        await asyncio.to_thread(tenant.funnel.flush)
+        report = await asyncio.to_thread(tenant.funnel.report, since, bucket)
+        lines = format_report(report)
+        if not lines:
+            await message.answer("📭 Нет событий за выбранный период.")
+            return
+        
+        text = (f"📉 <b>Воронка за {days} дн.</b>\n"
+                f"<i>когорта по дню первого шага: пользователи → сегмент → контент → форма → лид (конверсия)</i>\n\n")
+        text += "\n".join(lines)
+        await message.answer(text[:4096], parse_mode='HTML')
+    except Exception as e:
+        logger.error(f"Error getting funnel report: {e}")
+        await message.answer("❌ Ошибка при построении воронки.")
+
+def format_lead(lead: Dict[str, Any]) -> str:
+    username = f"@{lead['username']}" if lead.get('username') else '—'
+    return (f"👤 <b>{lead.get('name', '')}</b> {lead.get('phone', '')}\n"
+            f"{username}, ID {lead.get('user_id', '')}\n"
+            f"{lead.get('date', '')} · {lead.get('segment', '')} · {lead.get('action', '')}\n"
+            f"Статус: <b>{lead.get('status', '')}</b>")
+
+@router.message(Command("lead"))
+async def lead_search_handler(message: Message, tenant: Tenant):
+    """Поиск лида по телефону, имени, username или user_id, только для админов"""
+    if not tenant.is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет доступа к лидам.")
+        return
+    
+    query = (message.text or "").partition(" ")[2].strip()
+    if not query:
+        await message.answer("Использование: /lead <телефон | имя | @username | user_id>")
+        return
+    
+    # В многопроцессном режиме лиды добавляют и другие воркеры
+    await tenant.sheets.sync_index()
+    leads = tenant.sheets.search_leads(query, limit=5)
+    if leads is None:
+        await message.answer("❌ Google Sheets недоступен.")
+        return
+    if not leads:
+        await message.answer("🔍 Ничего не найдено.")
+        return
+    
+    for lead in leads:
+        await message.answer(
+            format_lead(lead),
+            reply_markup=get_lead_status_keyboard(lead['row']),
+            parse_mode='HTML'
+        )
+
+@router.callback_query(F.data.startswith("lead_status_"))
+async def lead_status_handler(callback: CallbackQuery, tenant: Tenant):
+    if not tenant.is_admin(callback.from_user.id):
+        await callback.answer("❌ Нет доступа", show_alert=True)
+        return
+    
+    _, _, row, status_idx = callback.data.split("_")
+    row, status = int(row), LEAD_STATUSES[int(status_idx)]
+    
+    await tenant.sheets.sync_index()
+    lead = tenant.sheets.get_lead(row)
+    if lead and lead.get('status') == status:
+        await callback.answer(f"Статус уже: {status}")
+        return
+    
+    if await tenant.sheets.update_lead_status(row, status):
+        await callback.message.edit_text(
+            format_lead(tenant.sheets.get_lead(row)),
+            reply_markup=get_lead_status_keyboard(row),
+            parse_mode='HTML'
+        )
+        await callback.answer(f"Статус: {status}")
+    else:
+        await callback.answer("❌ Не удалось обновить статус", show_alert=True)
+
 @router.message(Command("menu"))
-async def menu_handler(message: Message):
+async def menu_handler(message: Message, tenant: Tenant):
     """ команда /menu """
     user_id = message.from_user.id
-    segment = user_data.get(user_id, {}).get('segment', 'other')
+    segment = tenant.user_data.get(user_id, {}).get('segment', 'other')
+    tenant.track(user_id, 'menu')
     
     await message.answer(
-        SEGMENT_MESSAGES[segment],
-        reply_markup=get_main_menu_keyboard(),
+        tenant.texts.SEGMENT_MESSAGES[segment],
+        reply_markup=get_main_menu_keyboard(tenant.texts),
         parse_mode='HTML'
     )
 
 @router.callback_query(F.data.startswith("segment_"))
-async def segment_handler(callback: CallbackQuery):
+async def segment_handler(callback: CallbackQuery, tenant: Tenant):
     segment = callback.data.split("_")[1]
     user_id = callback.from_user.id
     
-    if user_id in user_data:
-        user_data[user_id]['segment'] = segment
+    if user_id in tenant.user_data:
+        tenant.user_data[user_id]['segment'] = segment
+    tenant.track(user_id, 'segment', segment)
     
     await callback.message.edit_text(
-        SEGMENT_MESSAGES[segment],
-        reply_markup=get_main_menu_keyboard(),
+        tenant.texts.SEGMENT_MESSAGES[segment],
+        reply_markup=get_main_menu_keyboard(tenant.texts),
         parse_mode='HTML'
     )
     await callback.answer()
 
 @router.callback_query(F.data == "how_it_works")
-async def how_it_works_handler(callback: CallbackQuery):
+async def how_it_works_handler(callback: CallbackQuery, tenant: Tenant):
+    tenant.track(callback.from_user.id, 'how_it_works')
     await callback.message.edit_text(
-        HOW_IT_WORKS_TEXT,
-        reply_markup=get_back_keyboard(),
+        tenant.texts.HOW_IT_WORKS_TEXT,
+        reply_markup=get_back_keyboard(tenant.texts),
         parse_mode='HTML'
     )
     await callback.answer()
 
 @router.callback_query(F.data == "case_studies")
-async def case_studies_handler(callback: CallbackQuery):
+async def case_studies_handler(callback: CallbackQuery, tenant: Tenant):
+    tenant.track(callback.from_user.id, 'case_studies')
     await callback.message.edit_text(
-        CASE_STUDIES_HANDLER_TEXT,
-        reply_markup=get_case_studies_keyboard(),
+        tenant.texts.CASE_STUDIES_HANDLER_TEXT,
+        reply_markup=get_case_studies_keyboard(tenant.texts),
         parse_mode='HTML'
     )
     await callback.answer()
 
 @router.callback_query(F.data.startswith("case_"))
-async def case_detail_handler(callback: CallbackQuery):
+async def case_detail_handler(callback: CallbackQuery, tenant: Tenant):
     case_type = callback.data.split("_")[1]
+    tenant.track(callback.from_user.id, 'case_view')
     
     await callback.message.edit_text(
-        CASE_STUDIES[case_type],
-        reply_markup=get_back_keyboard(),
+        tenant.texts.CASE_STUDIES[case_type],
+        reply_markup=get_back_keyboard(tenant.texts),
         parse_mode='HTML'
     )
     await callback.answer()
 
 @router.callback_query(F.data == "faq")
-async def faq_handler(callback: CallbackQuery):
+async def faq_handler(callback: CallbackQuery, tenant: Tenant):
+    tenant.track(callback.from_user.id, 'faq')
     await callback.message.edit_text(
-        FAQ_HANDLER_TEXT,
-        reply_markup=get_faq_keyboard(),
+        tenant.texts.FAQ_HANDLER_TEXT,
+        reply_markup=get_faq_keyboard(tenant.texts),
         parse_mode='HTML'
     )
     await callback.answer()
 
 @router.callback_query(F.data.startswith("faq_"))
-async def faq_detail_handler(callback: CallbackQuery):
+async def faq_detail_handler(callback: CallbackQuery, tenant: Tenant):
     faq_type = callback.data.split("_")[1]
+    tenant.track(callback.from_user.id, 'faq_view')
     
     await callback.message.edit_text(
-        FAQ_ANSWERS[faq_type],
-        reply_markup=get_back_keyboard(),
+        tenant.texts.FAQ_ANSWERS[faq_type],
+        reply_markup=get_back_keyboard(tenant.texts),
         parse_mode='HTML'
     )
     await callback.answer()
 
 @router.callback_query(F.data == "get_template")
-async def get_template_handler(callback: CallbackQuery, state: FSMContext):
+async def get_template_handler(callback: CallbackQuery, state: FSMContext, tenant: Tenant):
     await state.set_state(UserStates.waiting_for_name)
     await state.update_data(action="template")
-    await callback.message.edit_text(GET_TEMPLATE_TEXT, reply_markup=get_back_keyboard(),parse_mode='HTML')
+    tenant.track(callback.from_user.id, 'lead_form')
+    await callback.message.edit_text(tenant.texts.GET_TEMPLATE_TEXT, reply_markup=get_back_keyboard(tenant.texts),parse_mode='HTML')
     # testing
-    logger.info(f"get back from get template ,checking user_data {user_data}")
+    logger.info(f"get back from get template ,checking user_data {tenant.user_data}")
     await callback.answer()
 
 @router.callback_query(F.data == "order_demo")
-async def order_demo_handler(callback: CallbackQuery, state: FSMContext):
+async def order_demo_handler(callback: CallbackQuery, state: FSMContext, tenant: Tenant):
     await state.set_state(UserStates.waiting_for_name)
     await state.update_data(action="demo")
-    await callback.message.edit_text(ORDER_DEMO_TEXT,reply_markup=get_back_keyboard(), parse_mode='HTML')
+    tenant.track(callback.from_user.id, 'lead_form')
+    await callback.message.edit_text(tenant.texts.ORDER_DEMO_TEXT,reply_markup=get_back_keyboard(tenant.texts), parse_mode='HTML')
     # testing
-    logger.info(f"get back from order demo,checking user_data {user_data}")
+    logger.info(f"get back from order demo,checking user_data {tenant.user_data}")
     
     await callback.answer()
 
 @router.callback_query(F.data == "back_to_menu")
-async def back_to_menu_handler(callback: CallbackQuery):
+async def back_to_menu_handler(callback: CallbackQuery, tenant: Tenant):
     user_id = callback.from_user.id
-    segment = user_data.get(user_id, {}).get('segment', 'other')
+    segment = tenant.user_data.get(user_id, {}).get('segment', 'other')
     
     await callback.message.edit_text(
-        SEGMENT_MESSAGES[segment],
-        reply_markup=get_main_menu_keyboard(),
+        tenant.texts.SEGMENT_MESSAGES[segment],
+        reply_markup=get_main_menu_keyboard(tenant.texts),
         parse_mode='HTML'
     )
     await callback.answer()
 
 
 @router.message(StateFilter(UserStates.waiting_for_name))
-async def process_name(message: Message, state: FSMContext):
+async def process_name(message: Message, state: FSMContext, tenant: Tenant):
     user_data_state = await state.get_data()
     action = user_data_state.get('action')
     
@@ -221,9 +339,10 @@ async def process_name(message: Message, state: FSMContext):
         return
     
     user_id = message.from_user.id
-    if user_id in user_data:
-        user_data[user_id]['name'] = name
+    if user_id in tenant.user_data:
+        tenant.user_data[user_id]['name'] = name
     
+    tenant.track(user_id, 'name')
     await state.update_data(name=message.text)
     await state.set_state(UserStates.waiting_for_phone)
     
@@ -233,14 +352,14 @@ async def process_name(message: Message, state: FSMContext):
     await message.answer(
         f"👍 Приятно познакомиться, {message.text}!\n\n"
         f"<b>Теперь введите ваш номер телефона для {action_text}:</b>\n\n"
-        f"Например: +7 999 123-45-67",reply_markup=get_back_keyboard(),
+        f"Например: +7 999 123-45-67",reply_markup=get_back_keyboard(tenant.texts),
         parse_mode="HTML"
     )
     
 
 
 @router.message(StateFilter(UserStates.waiting_for_phone))
-async def process_phone(message: Message, state: FSMContext):
+async def process_phone(message: Message, state: FSMContext, tenant: Tenant):
     user_data_state = await state.get_data()
     action = user_data_state.get('action')
     name = user_data_state.get('name')
@@ -251,11 +370,12 @@ async def process_phone(message: Message, state: FSMContext):
         return
     
     user_id = message.from_user.id
-    if user_id in user_data:
-        user_data[user_id]['phone'] = phone
-        user_data[user_id]['name'] = name
+    tenant.track(user_id, 'lead')
+    if user_id in tenant.user_data:
+        tenant.user_data[user_id]['phone'] = phone
+        tenant.user_data[user_id]['name'] = name
     
-    user_data[user_id] = {
+    tenant.user_data[user_id] = {
         'user_id': user_id,
         'username': message.from_user.username,
         'first_name': message.from_user.first_name,
@@ -263,15 +383,15 @@ async def process_phone(message: Message, state: FSMContext):
    
    
     try:
-        success = await save_lead_to_sheets(user_data.get(user_id, {}), name, message.text, action)
+        success = await tenant.sheets.save_lead(tenant.user_data.get(user_id, {}), name, message.text, action)
         if success:
-            logger.info(f"Lead saved to Google Sheets: {name}, {message.text}, {action}")
-            logger.info(f"before deleting user_data: {user_data}" )
-            if user_id in user_data:
-                del user_data[user_id]
-            logger.info(f"after deleting user data {user_data}")
+            logger.info(f"Lead saved: {name}, {message.text}, {action}")
+            logger.info(f"before deleting user_data: {tenant.user_data}" )
+            if user_id in tenant.user_data:
+                del tenant.user_data[user_id]
+            logger.info(f"after deleting user data {tenant.user_data}")
         else:
-            logger.warning("Failed to save lead to Google Sheets")
+            logger.warning("Failed to save lead")
     except Exception as e:
         logger.error(f"Error saving to Google Sheets: {e}")
     
@@ -279,44 +399,135 @@ async def process_phone(message: Message, state: FSMContext):
     logger.info(f"New lead: {name}, {message.text}, {action}")
     
     if action == "template":
-        text = ACTION_TEMPLATE_TEXT
+        text = tenant.texts.ACTION_TEMPLATE_TEXT
     else:
-        text = ACTION_DEMO_TEXT
+        text = tenant.texts.ACTION_DEMO_TEXT
+    
+    if action == "template":
+        if not tenant.media.keys('template'):
+            logger.warning(f"No templates to send to {message.from_user.id}: templates directory is missing or empty")
+        for key in tenant.media.keys('template'):
+            try:
+                await tenant.media.send(tenant.bot, message.chat.id, key)
+            except Exception as e:
+                logger.error(f"Error sending template {key}: {e}")
     
     await message.answer(
         text,
-        reply_markup=get_main_menu_keyboard(),
+        reply_markup=get_main_menu_keyboard(tenant.texts),
         parse_mode='HTML'
     )
     await state.clear()
 
 # ЗДЕСЬ МОЖНО ДОБАВИТЬ ЛОГИКУ ИИ ЛЛМ И ТД.
 @router.message()
-async def unknown_message_handler(message: Message):
+async def unknown_message_handler(message: Message, tenant: Tenant):
     await message.answer(
         "🤔 Не совсем понял вас. Воспользуйтесь меню ниже или напишите /start для начала.",
-        reply_markup=get_main_menu_keyboard()
+        reply_markup=get_main_menu_keyboard(tenant.texts)
     )
 
 @router.callback_query(F.data=="exit")
-async def exit(callback:CallbackQuery):
+async def exit(callback:CallbackQuery, tenant: Tenant):
     user_id = callback.from_user.id
+    tenant.track(user_id, 'exit')
     
-    if user_id in user_data:
-        del user_data[user_id]
+    if user_id in tenant.user_data:
+        del tenant.user_data[user_id]
     
     await callback.message.answer(
-        text = EXIT_TEXT,
+        text = tenant.texts.EXIT_TEXT,
         parse_mode='HTML'
     )
+async def flush_funnel_periodically(tenant: Tenant):
+    """Сброс событий воронки на диск раз в интервал или сразу при заполнении буфера"""
+    full = asyncio.Event()
+    # track вызывается из хендлеров в потоке цикла событий
+    tenant.funnel.on_full = full.set
+    while True:
+        try:
+            await asyncio.wait_for(full.wait(), FUNNEL_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        full.clear()
+        await asyncio.to_thread(tenant.funnel.flush)
+
+async def start_tenants(tenants: List[Tenant], prewarm: bool = True, sheets: bool = True) -> List[asyncio.Task]:
+    """Подключение диспетчера и фоновых задач ботов
+
+    С sheets=False Google Sheets не подключается: лиды остаются в локальной очереди.
+    """
+    dp.update.outer_middleware(TenantMiddleware(tenants))
+    dp.include_router(router)
+    
+    tasks = []
+    for tenant in tenants:
+        # Подключение к Google Sheets не задерживает запуск: до его завершения
+        # лиды пишутся в локальную очередь
+        if sheets:
+            tasks.append(asyncio.create_task(tenant.sheets.init()))
+            tasks.append(asyncio.create_task(tenant.sheets.watchdog()))
+        tasks.append(asyncio.create_task(flush_funnel_periodically(tenant)))
+        if prewarm and tenant.prewarm_chat_id:
+            tasks.append(asyncio.create_task(tenant.media.prewarm(tenant.bot, tenant.prewarm_chat_id)))
+    return tasks
+
+async def stop_tenants(tenants: List[Tenant], tasks: List[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    for tenant in tenants:
+        tenant.funnel.flush()
+
 async def main():
-    await init_google_sheets()
+    if WORKERS > 1:
+        from sharding import run_front
+        await run_front(WORKERS)
+        return
     
-    dp.include_router(router)
-    await bot.delete_webhook(drop_pending_updates=True)
+    # Одна HTTP-сессия (пул соединений aiohttp) на все боты процесса,
+    # в режиме бенчмарка - заглушка без обращения к Telegram
+    if STARTUP_BENCH:
+        from stub_session import StubSession
+        session = StubSession()
+    else:
+        session = AiohttpSession()
+    tenants = load_tenants(session)
+    profile.mark('tenants')
+    
+    # Бенчмарк не открывает настоящую таблицу и не греет кэш медиа
+    tasks = await start_tenants(tenants, prewarm=not STARTUP_BENCH, sheets=not STARTUP_BENCH)
+    profile.mark('dispatcher')
+    
+    # Клавиатуры собираются до первого апдейта
+    for tenant in tenants:
+        for build_keyboard in (get_segment_keyboard, get_main_menu_keyboard, get_case_studies_keyboard,
+                               get_faq_keyboard, get_back_keyboard):
+            build_keyboard(tenant.texts)
+    profile.mark('static')
     
-    logger.info("Bot started")
-    await dp.start_polling(bot)
+    if STARTUP_BENCH:
+        # Первый апдейт проходит через диспетчер и хендлер /start как при polling
+        from stub_session import message_update
+        await dp.feed_raw_update(tenants[0].bot, message_update(1, 1, '/start'))
+        profile.mark('first_update')
+        print(json.dumps(profile.as_dict()))
+        await stop_tenants(tenants, tasks)
+        await session.close()
+        return
+    
+    for tenant in tenants:
+        await tenant.bot.delete_webhook(drop_pending_updates=True)
+    profile.mark('webhook')
+    profile.report()
+    
+    logger.info(f"Bot started: {len(tenants)} bot(s)")
+    try:
+        await dp.start_polling(*[tenant.bot for tenant in tenants])
+    finally:
+        await stop_tenants(tenants, tasks)
+        await session.close()
+
+profile.mark('imports')
 
 if __name__ == "__main__":
     try:
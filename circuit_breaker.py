@@ -0,0 +1,108 @@
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонен: предохранитель разомкнут"""
+
+
+class CircuitBreaker:
+    """Предохранитель для вызовов внешнего сервиса
+
+    Размыкается, когда доля неудачных или медленных вызовов в окне
+    последних window вызовов превышает failure_rate. Через open_seconds
+    пропускает один пробный вызов (half-open): успех замыкает цепь,
+    ошибка снова размыкает.
+
+    Вызовы выполняются в executor (по умолчанию - пул потоков цикла).
+    Таймаут не останавливает поток, поэтому для сервиса, который может
+    зависнуть, стоит передать отдельный ограниченный пул.
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, slow_call_seconds: float = 5.0,
+                 window: int = 20, min_calls: int = 5, open_seconds: float = 30.0,
+                 executor: Optional[Executor] = None):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.results = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.executor = executor
+
+    def allow(self) -> bool:
+        """Можно ли сейчас выполнять вызов"""
+        if self.state == CLOSED:
+            return True
+
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            logger.info(f"Circuit {self.name} half-open, probing")
+
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def record(self, success: bool, duration: float):
+        """Учет результата вызова"""
+        failed = not success or duration >= self.slow_call_seconds
+
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = False
+            if failed:
+                self._open()
+            else:
+                self.state = CLOSED
+                self.results.clear()
+                logger.info(f"Circuit {self.name} closed")
+            return
+
+        self.results.append(failed)
+        if len(self.results) >= self.min_calls:
+            if sum(self.results) / len(self.results) >= self.failure_rate:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.results.clear()
+        logger.warning(f"Circuit {self.name} open for {self.open_seconds}s")
+
+    async def call(self, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Выполнение блокирующей функции в потоке через предохранитель"""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit {self.name} is open")
+
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            # Вызов, еще ждущий свободного потока, при таймауте отменяется и не выполнится
+            future = loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+            result = await asyncio.wait_for(future, timeout)
+        except asyncio.CancelledError:
+            # Отмена - не ошибка сервиса, но пробный вызов нужно освободить
+            self.probe_in_flight = False
+            raise
+        except Exception:
+            self.record(False, time.monotonic() - started)
+            raise
+
+        self.record(True, time.monotonic() - started)
+        return result
@@ -1,13 +1,33 @@
 import os
 from dotenv import load_dotenv
 
-load_dotenv()
+# .env рядом с config.py, без поиска по родительским каталогам
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
 BOT_TOKEN = os.getenv('BOT_TOKEN', '')
 admin_str = os.getenv("ADMIN_IDS","")
 ADMIN_IDS = [int(x) for x in admin_str.split(",") if x]
 
+# JSON со списком ботов для запуска нескольких ботов в одном процессе
+TENANTS_CONFIG = os.getenv('TENANTS_CONFIG', '')
+
+# Количество воркеров: 1 - один процесс, больше - апдейты распределяются по user_id
+WORKERS = int(os.getenv('WORKERS', '1'))
+# FSM-хранилище: memory или redis://host:port/db
+FSM_STORAGE = os.getenv('FSM_STORAGE', 'memory')
+# Замер запуска без подключения к Telegram: вывести профиль и выйти
+STARTUP_BENCH = os.getenv('STARTUP_BENCH', '') == '1'
+
 GOOGLE_CREDENTIALS_PATH = os.getenv('GOOGLE_CREDENTIALS_PATH', 'google_credentials.json')
 GOOGLE_SPREADSHEET_NAME = os.getenv('GOOGLE_SPREADSHEET_NAME', 'SignContract Leads')
 
-if BOT_TOKEN == '':
+FUNNEL_LOG_PATH = os.getenv('FUNNEL_LOG_PATH', 'funnel_events.bin')
+FUNNEL_FLUSH_INTERVAL = int(os.getenv('FUNNEL_FLUSH_INTERVAL', '30'))
+
+MEDIA_CACHE_PATH = os.getenv('MEDIA_CACHE_PATH', 'media_cache.json')
+TEMPLATES_DIR = os.getenv('TEMPLATES_DIR', 'templates')
+WELCOME_IMAGE_PATH = os.getenv('WELCOME_IMAGE_PATH', '491836378_1894484311286837_5509417888307568976_n.jpg')
+# Чат для предварительной загрузки файлов, по умолчанию первый админ
+MEDIA_PREWARM_CHAT_ID = int(os.getenv('MEDIA_PREWARM_CHAT_ID', '0')) or (ADMIN_IDS[0] if ADMIN_IDS else 0)
+
+if BOT_TOKEN == '' and TENANTS_CONFIG == '':
     raise ValueError("Пожалуйста, установите BOT_TOKEN в файле .env")
\ No newline at end of file
@@ -0,0 +1,326 @@
+import glob
+import logging
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# События воронки: код события -> имя
+EVENTS = {
+    'start': 0,
+    'segment': 1,
+    'menu': 2,
+    'how_it_works': 3,
+    'case_studies': 4,
+    'case_view': 5,
+    'faq': 6,
+    'faq_view': 7,
+    'lead_form': 8,
+    'name': 9,
+    'lead': 10,
+    'exit': 11,
+}
+
+SEGMENTS = {'unknown': 0, 'ip': 1, 'lawyer': 2, 'hr': 3, 'other': 4}
+SEGMENT_NAMES = {code: name for name, code in SEGMENTS.items()}
+
+# Шаги воронки для отчета: шаг -> коды событий, которые его засчитывают
+STAGES = {
+    'segment': (EVENTS['segment'],),
+    'content': (EVENTS['how_it_works'], EVENTS['case_studies'], EVENTS['case_view'],
+                EVENTS['faq'], EVENTS['faq_view']),
+    'lead_form': (EVENTS['lead_form'],),
+    'lead': (EVENTS['lead'],),
+}
+
+# Номер шага в отчете и таблица перевода кода события в номер шага,
+# события вне воронки получают NO_STAGE
+STAGE_NAMES = list(STAGES)
+NO_STAGE = 255
+STAGE_TABLE = bytes(
+    next((STAGE_NAMES.index(stage) for stage, codes in STAGES.items() if code in codes), NO_STAGE)
+    for code in range(256)
+)
+
+MAGIC = b'FNL2'
+# Заголовок блока: количество событий, минимальный и максимальный ts
+BLOCK_HEADER = struct.Struct('<III')
+# Колонки файла: (typecode, размер элемента в байтах)
+COLUMNS = (('I', 4), ('q', 8), ('B', 1), ('B', 1))
+# Те же колонки как типы numpy, файл всегда little-endian
+DTYPES = ('<u4', '<i8', 'u1', 'u1')
+
+
+class FunnelLog:
+    """Лог событий воронки: буфер в памяти + колоночный файл на диске
+
+    Файл состоит из блоков; каждый блок - это заголовок (число событий,
+    min/max ts) и четыре колонки подряд (ts, user_id, event, segment),
+    записанные как сырые массивы array. Блоки только дописываются в конец
+    файла, а при чтении блоки старше since пропускаются по заголовку.
+
+    В многопроцессном режиме каждый воркер пишет в свой файл path.<shard>,
+    а отчет читает все файлы воронки.
+
+    track не пишет на диск: при заполнении буфера он один раз вызывает
+    on_full, а сброс делает фоновая задача.
+    """
+
+    def __init__(self, path: str, capacity: int = 4096, shard: Optional[int] = None):
+        self.base_path = path
+        self.path = path if shard is None else f"{path}.{shard}"
+        self.capacity = capacity
+        self.on_full: Optional[Callable[[], None]] = None
+        self._full_signalled = False
+        self._format_checked = False
+        # Короткая блокировка на добавление в буфер и его подмену,
+        # отдельная - на запись в файл, чтобы блоки не перемешивались
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        self.ts = array('I')
+        self.user_ids = array('q')
+        self.events = array('B')
+        self.segments = array('B')
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def track(self, user_id: int, event: str, segment: Optional[str] = None):
+        """Запись события в буфер, сигнал on_full при заполнении"""
+        with self._buffer_lock:
+            self.ts.append(int(time.time()))
+            self.user_ids.append(user_id)
+            self.events.append(EVENTS[event])
+            self.segments.append(SEGMENTS.get(segment or 'unknown', 0))
+            signal = len(self.events) >= self.capacity and not self._full_signalled
+            if signal:
+                self._full_signalled = True
+
+        if signal and self.on_full is not None:
+            self.on_full()
+
+    def _take_buffer(self) -> List[array]:
+        """Подмена буфера: события, пришедшие во время записи, попадут в новый"""
+        with self._buffer_lock:
+            columns = [self.ts, self.user_ids, self.events, self.segments]
+            self._reset_buffer()
+            self._full_signalled = False
+        return columns
+
+    def flush(self) -> int:
+        """Дописывание буфера в файл одним блоком"""
+        with self._flush_lock:
+            columns = self._take_buffer()
+            count = len(columns[0])
+            if not count:
+                return 0
+
+            ts = columns[0]
+            header = BLOCK_HEADER.pack(count, min(ts), max(ts))
+
+            if sys.byteorder == 'big':
+                for column in columns:
+                    column.byteswap()
+
+            try:
+                self._check_format()
+                is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+                with open(self.path, 'ab') as f:
+                    if is_new:
+                        f.write(MAGIC)
+                    f.write(header)
+                    for column in columns:
+                        column.tofile(f)
+            except OSError as e:
+                logger.error(f"Failed to flush funnel events: {e}")
+                return 0
+
+            return count
+
+    def _check_format(self):
+        """Файл старого формата переименовывается, чтобы не дописывать в него новые блоки
+
+        Проверяется один раз: дальше файл пишет только этот процесс.
+        """
+        if self._format_checked:
+            return
+        self._format_checked = True
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+        if magic and magic != MAGIC:
+            legacy_path = f"{self.path}.legacy"
+            os.replace(self.path, legacy_path)
+            logger.warning(f"Funnel log in old format moved to {legacy_path}")
+
+    def paths(self) -> List[str]:
+        """Файлы воронки всех воркеров"""
+        shards = [path for path in glob.glob(glob.escape(self.base_path) + '.*')
+                  if path.rsplit('.', 1)[1].isdigit()]
+        return [self.base_path] + sorted(shards)
+
+    def load(self, since: int = 0) -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray', 'np.ndarray']:
+        """Колонки с ts >= since из всех файлов и несброшенного буфера"""
+        # numpy нужен только отчетам, импортируется при первом из них, а не при запуске бота
+        import numpy as np
+
+        parts: List[Tuple['np.ndarray', ...]] = []
+        for path in self.paths():
+            parts.extend(self._load_file(path, since))
+
+        with self._buffer_lock:
+            buffered = tuple(np.array(column, dtype=dtype)
+                             for column, dtype in zip((self.ts, self.user_ids, self.events, self.segments), DTYPES))
+        start = np.searchsorted(buffered[0], since)
+        parts.append(tuple(column[start:] for column in buffered))
+
+        return tuple(np.concatenate([part[i] for part in parts]).astype(dtype, copy=False)
+                     for i, dtype in enumerate(DTYPES))
+
+    @staticmethod
+    def _load_file(path: str, since: int = 0) -> List[Tuple['np.ndarray', ...]]:
+        """Блоки одного файла с событиями ts >= since"""
+        import numpy as np
+
+        if not os.path.exists(path):
+            return []
+
+        row_size = sum(size for _, size in COLUMNS)
+        blocks = []
+        with open(path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                if magic:
+                    logger.error(f"Unknown funnel log format: {path}")
+                return []
+
+            while True:
+                header = f.read(BLOCK_HEADER.size)
+                if len(header) < BLOCK_HEADER.size:
+                    if header:
+                        logger.warning(f"Truncated funnel block skipped: {path}")
+                    break
+
+                count, _, max_ts = BLOCK_HEADER.unpack(header)
+                if max_ts < since:
+                    # Весь блок старше запрошенного периода
+                    f.seek(count * row_size, os.SEEK_CUR)
+                    continue
+
+                data = f.read(count * row_size)
+                if len(data) < count * row_size:
+                    # Недописанный блок (например, после падения процесса)
+                    logger.warning(f"Truncated funnel block skipped: {path}")
+                    break
+
+                block = []
+                offset = 0
+                for (_, size), dtype in zip(COLUMNS, DTYPES):
+                    block.append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+                    offset += count * size
+
+                # События внутри блока идут по времени, граница ищется бинпоиском
+                start = np.searchsorted(block[0], since)
+                blocks.append(tuple(column[start:] for column in block))
+
+        return blocks
+
+    def report(self, since: int = 0, bucket_seconds: int = 86400) -> Dict[Tuple[int, str], Dict[str, int]]:
+        """Когорты пользователей по шагам воронки для каждой пары (бакет, сегмент)
+
+        Пользователь относится к бакету своего первого события воронки за
+        период, и все его шаги за период засчитываются этой когорте, даже
+        если они случились в следующие дни. 'users' - размер когорты, база
+        конверсии. Сегмент пользователя - последний выбранный им сегмент.
+        Бакетизация и дедупликация делаются целыми колонками через numpy.
+        """
+        import numpy as np
+
+        ts, user_ids, events, segments = self.load(since)
+        if not len(ts):
+            return {}
+
+        # Файлы воркеров склеены подряд, для "первого события" и "последнего сегмента" нужен порядок по времени
+        if np.any(np.diff(ts.astype(np.int64)) < 0):
+            order = np.argsort(ts, kind='stable')
+            ts, user_ids, events, segments = ts[order], user_ids[order], events[order], segments[order]
+
+        buckets = ts.astype(np.int64) // bucket_seconds
+        first_bucket = int(buckets.min())
+        # Номер пользователя после факторизации
+        _, user_idx = np.unique(user_ids, return_inverse=True)
+        users_count = int(user_idx.max()) + 1
+
+        stages = np.frombuffer(STAGE_TABLE, dtype=np.uint8)[events]
+        in_funnel = np.flatnonzero(stages != NO_STAGE)
+        if not len(in_funnel):
+            return {}
+
+        # Когорта пользователя - бакет его первого события воронки
+        cohorts = np.zeros(users_count, dtype=np.int64)
+        funnel_users, first = np.unique(user_idx[in_funnel], return_index=True)
+        cohorts[funnel_users] = buckets[in_funnel[first]] - first_bucket
+
+        # Последний ненулевой сегмент пользователя: первое вхождение в развернутом порядке
+        user_segments = np.zeros(users_count, dtype=np.int64)
+        with_segment = np.flatnonzero(segments)[::-1]
+        segment_users, first = np.unique(user_idx[with_segment], return_index=True)
+        user_segments[segment_users] = segments[with_segment[first]]
+
+        # Уникальные пары (пользователь, шаг) и размеры когорт
+        stage_count = len(STAGE_NAMES)
+        seen = _unique(user_idx[in_funnel] * stage_count + stages[in_funnel])
+        seen_users = seen // stage_count
+        groups = cohorts * 256 + user_segments
+        stage_codes, stage_counts = np.unique(groups[seen_users] * stage_count + seen % stage_count,
+                                              return_counts=True)
+        group_codes, group_counts = np.unique(groups[funnel_users], return_counts=True)
+
+        result: Dict[Tuple[int, str], Dict[str, int]] = {}
+
+        def counts(group: int) -> Dict[str, int]:
+            bucket = (group // 256 + first_bucket) * bucket_seconds
+            key = (bucket, SEGMENT_NAMES.get(group % 256, 'unknown'))
+            return result.setdefault(key, dict(users=0, **dict.fromkeys(STAGES, 0)))
+
+        for group, count in zip(group_codes.tolist(), group_counts.tolist()):
+            counts(group)['users'] = count
+        for code, count in zip(stage_codes.tolist(), stage_counts.tolist()):
+            counts(code // stage_count)[STAGE_NAMES[code % stage_count]] = count
+
+        return result
+
+
+def _unique(values: 'np.ndarray') -> 'np.ndarray':
+    """Уникальные значения через сортировку: на миллионах int64 быстрее хеширования в np.unique"""
+    import numpy as np
+
+    values = np.sort(values)
+    if not len(values):
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+def format_report(report: Dict[Tuple[int, str], Dict[str, int]]) -> List[str]:
+    """Строки отчета с конверсией когорты в лид по бакетам"""
+    lines = []
+    for (bucket, segment), counts in sorted(report.items()):
+        conversion = counts['lead'] / counts['users'] * 100 if counts['users'] else 0.0
+        day = time.strftime('%Y-%m-%d', time.gmtime(bucket))
+        lines.append(
+            f"{day} {segment}: {counts['users']} → {counts['segment']} → {counts['content']} → "
+            f"{counts['lead_form']} → {counts['lead']} ({conversion:.1f}%)"
+        )
+    return lines
@@ -1,75 +1,163 @@
+import asyncio
+import glob
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional
-import gspread
-from gspread import Client
-from google.oauth2.service_account import Credentials
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
 import json
 import os
+import re
+import time
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED
+from lead_index import LeadIndex, normalize_phone
+
+if TYPE_CHECKING:
+    from gspread import Client
 
 logger = logging.getLogger(__name__)
 
+# Таймаут одного запроса к Google Sheets, секунды
+SHEETS_TIMEOUT = float(os.getenv('SHEETS_TIMEOUT', '10'))
+# Локальная очередь лидов на время недоступности Google Sheets
+LEAD_SPOOL_PATH = os.getenv('LEAD_SPOOL_PATH', 'leads_spool.jsonl')
+# Через сколько секунд после таймаута записи лида можно проверять,
+# попал ли он в таблицу: зависший запрос к этому времени завершится
+UNCONFIRMED_GRACE = 3 * SHEETS_TIMEOUT
+# Возраст индекса лидов, после которого он перечитывается из таблицы
+# перед поиском, в многопроцессном режиме (лиды добавляют все воркеры)
+SHARED_INDEX_TTL = float(os.getenv('SHEETS_INDEX_TTL', '10'))
+# Сколько неудачных проб подряд до полного переподключения
+RECONNECT_AFTER = int(os.getenv('SHEETS_RECONNECT_AFTER', '3'))
+
+# Потоков gspread на одну таблицу
+SHEETS_THREADS = int(os.getenv('SHEETS_THREADS', '2'))
+
+
+def make_breaker(name: str = 'google_sheets') -> CircuitBreaker:
+    """Предохранитель для Google Sheets с порогами из окружения
+
+    У каждого предохранителя (то есть у каждого бота) свой маленький пул
+    потоков: зависшие запросы к таблице одного бота не занимают потоки
+    других ботов и пул по умолчанию, которым пользуется сброс воронки.
+    """
+    return CircuitBreaker(
+        name,
+        failure_rate=float(os.getenv('SHEETS_FAILURE_RATE', '0.5')),
+        slow_call_seconds=float(os.getenv('SHEETS_SLOW_CALL', '5')),
+        open_seconds=float(os.getenv('SHEETS_OPEN_SECONDS', '30')),
+        executor=ThreadPoolExecutor(max_workers=SHEETS_THREADS, thread_name_prefix=name.replace(':', '-')),
+    )
+
+
 class GoogleSheetsManager:
     """Менеджер для работы с Google Sheets"""
     
-    def __init__(self, credentials_path: str, spreadsheet_name: str):
+    def __init__(self, credentials_path: str, spreadsheet_name: str,
+                 breaker: Optional[CircuitBreaker] = None):
         self.credentials_path = credentials_path
         self.spreadsheet_name = spreadsheet_name
-        self.client: Optional[Client] = None
+        self.breaker = breaker or make_breaker()
+        self.client: Optional['Client'] = None
         self.worksheet = None
+        self.index = LeadIndex()
+    
+    async def call(self, func, *args, **kwargs):
+        """Блокирующий вызов gspread в потоке через предохранитель"""
+        return await self.breaker.call(func, *args, timeout=SHEETS_TIMEOUT, **kwargs)
+        
+    def _connect(self):
+        """Подключение к таблице, возвращает все записи листа"""
+        # gspread и google-auth тяжелые, импортируются при первом подключении
+        import gspread
+        from google.oauth2.service_account import Credentials
+        
+        scopes = [
+            'https://www.googleapis.com/auth/spreadsheets',
+            'https://www.googleapis.com/auth/drive'
+        ]
+        
+        # Загрузка учетных данных
+        if os.path.exists(self.credentials_path):
+            credentials = Credentials.from_service_account_file(
+                self.credentials_path, scopes=scopes
+            )
+        else:
+            # Если файла нет, пробуем загрузить из переменной окружения
+            credentials_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
+            if credentials_json:
+                credentials_info = json.loads(credentials_json)
+                credentials = Credentials.from_service_account_info(
+                    credentials_info, scopes=scopes
+                )
+            else:
+                raise FileNotFoundError("Google credentials not found")
+        
+        # Подключение к Google Sheets; таймаут HTTP, чтобы зависший поток освобождался
+        self.client = gspread.authorize(credentials)
+        self.client.set_timeout(SHEETS_TIMEOUT)
+        
+        # Открытие таблицы или создание новой
+        try:
+            spreadsheet = self.client.open(self.spreadsheet_name)
+        except gspread.SpreadsheetNotFound:
+            # Создаем новую таблицу если не существует
+            spreadsheet = self.client.create(self.spreadsheet_name)
+            logger.info(f"Created new spreadsheet: {self.spreadsheet_name}")
         
+        # Получаем первый лист или создаем
+        try:
+            self.worksheet = spreadsheet.sheet1
+        except:
+            self.worksheet = spreadsheet.add_worksheet(title="Leads", rows=1000, cols=20)
+        
+        return self.worksheet.get_all_records()
+    
     async def init_connection(self):
         """Инициализация подключения к Google Sheets"""
         try:
-            scopes = [
-                'https://www.googleapis.com/auth/spreadsheets',
-                'https://www.googleapis.com/auth/drive'
-            ]
-            
-            # Загрузка учетных данных
-            if os.path.exists(self.credentials_path):
-                credentials = Credentials.from_service_account_file(
-                    self.credentials_path, scopes=scopes
-                )
-            else:
-                # Если файла нет, пробуем загрузить из переменной окружения
-                credentials_json = os.getenv('GOOGLE_CREDENTIALS_JSON')
-                if credentials_json:
-                    credentials_info = json.loads(credentials_json)
-                    credentials = Credentials.from_service_account_info(
-                        credentials_info, scopes=scopes
-                    )
-                else:
-                    raise FileNotFoundError("Google credentials not found")
-            
-            # Подключение к Google Sheets
-            self.client = gspread.authorize(credentials)
-            
-            # Открытие таблицы или создание новой
-            try:
-                spreadsheet = self.client.open(self.spreadsheet_name)
-            except gspread.SpreadsheetNotFound:
-                # Создаем новую таблицу если не существует
-                spreadsheet = self.client.create(self.spreadsheet_name)
-                logger.info(f"Created new spreadsheet: {self.spreadsheet_name}")
-            
-            # Получаем первый лист или создаем
-            try:
-                self.worksheet = spreadsheet.sheet1
-            except:
-                self.worksheet = spreadsheet.add_worksheet(title="Leads", rows=1000, cols=20)
+            all_records = await self.call(self._connect)
             
             # Инициализируем заголовки если таблица пустая
-            if not self.worksheet.get_all_records():
+            if not all_records:
                 await self.setup_headers()
+            await self.load_index(all_records)
                 
             logger.info("Google Sheets connection established")
             return True
             
         except Exception as e:
-            logger.error(f"Failed to connect to Google Sheets: {e}")
+            logger.error(f"Failed to connect to Google Sheets: {e!r}")
             return False
     
+    @staticmethod
+    def build_index(all_records) -> LeadIndex:
+        """Построение поискового индекса по всем строкам таблицы"""
+        return LeadIndex.from_rows(
+            (idx, {
+                'date': record.get('Дата/Время', ''),
+                'name': record.get('Имя', ''),
+                'phone': record.get('Телефон', ''),
+                'segment': record.get('Сегмент', ''),
+                'action': record.get('Действие', ''),
+                'username': record.get('Username', ''),
+                'user_id': record.get('User ID', ''),
+                'status': record.get('Статус', ''),
+            })
+            for idx, record in enumerate(all_records, start=2)  # +2 т.к. индексация с 1 + заголовок
+        )
+    
+    async def load_index(self, all_records):
+        """Построение индекса в потоке и замена текущего готовым"""
+        index = await asyncio.to_thread(self.build_index, all_records)
+        # Лиды, добавленные, пока строился индекс, дописаны после прочитанных строк
+        last_row = len(all_records) + 1
+        for row, lead in list(self.index.leads.items()):
+            if row > last_row and row not in index.leads:
+                index.add(row, lead)
+        self.index = index
+        logger.info(f"Lead index built: {len(index)} leads")
+    
     async def setup_headers(self):
         """Настройка заголовков таблицы"""
         headers = [
@@ -85,10 +173,10 @@ class GoogleSheetsManager:
         ]
         
         try:
-            self.worksheet.insert_row(headers, 1)
+            await self.call(self.worksheet.insert_row, headers, 1)
             
             # Форматирование заголовков
-            self.worksheet.format('A1:I1', {
+            await self.call(self.worksheet.format, 'A1:I1', {
                 'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 1.0},
                 'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}},
                 'horizontalAlignment': 'CENTER'
@@ -99,8 +187,11 @@ class GoogleSheetsManager:
         except Exception as e:
             logger.error(f"Failed to setup headers: {e}")
     
-    async def add_lead(self, lead_data: Dict[str, Any]) -> bool:
-        """Добавление нового лида в таблицу"""
+    async def add_lead(self, lead_data: Dict[str, Any]) -> Optional[bool]:
+        """Добавление нового лида в таблицу
+
+        None - исход неизвестен (таймаут): запрос мог дойти до таблицы.
+        """
         if not self.worksheet:
             logger.error("Worksheet not initialized")
             return False
@@ -108,7 +199,7 @@ class GoogleSheetsManager:
         try:
             # Подготовка данных для вставки
             row_data = [
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                lead_data.get('created_at') or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 lead_data.get('name', ''),
                 lead_data.get('phone', ''),
                 lead_data.get('segment', ''),
@@ -120,11 +211,31 @@ class GoogleSheetsManager:
             ]
             
             # Добавление строки
-            self.worksheet.append_row(row_data)
+            response = await self.call(self.worksheet.append_row, row_data)
+            
+            # Номер добавленной строки берем из ответа API, например 'Sheet1!A5:I5'
+            updated_range = (response or {}).get('updates', {}).get('updatedRange', '')
+            match = re.search(r'!A(\d+)', updated_range)
+            row = int(match.group(1)) if match else max(self.index.leads, default=1) + 1
+            self.index.add(row, {
+                'date': row_data[0],
+                'name': row_data[1],
+                'phone': row_data[2],
+                'segment': row_data[3],
+                'action': row_data[4],
+                'username': row_data[5],
+                'user_id': row_data[6],
+                'status': row_data[7],
+            })
             
             logger.info(f"Lead added to Google Sheets: {lead_data.get('name', 'Unknown')}")
             return True
             
+        except CircuitOpenError:
+            return False
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout adding lead to Google Sheets: {lead_data.get('name', 'Unknown')}")
+            return None
         except Exception as e:
             logger.error(f"Failed to add lead to Google Sheets: {e}")
             return False
@@ -135,122 +246,369 @@ class GoogleSheetsManager:
             return False
             
         try:
-            # Находим строку с данным номером телефона
-            all_records = self.worksheet.get_all_records()
+            # Находим строку с данным номером телефона через индекс
+            leads = self.index.find_by_phone(phone)
+            if not leads:
+                logger.warning(f"Lead not found for phone: {phone}")
+                return False
             
-            for idx, record in enumerate(all_records, start=2):  # +2 т.к. индексация с 1 + заголовок
-                if record.get('Телефон') == phone:
-                    # Обновляем статус и примечания
-                    self.worksheet.update_cell(idx, 8, status)  # Колонка "Статус"
-                    if notes:
-                        current_notes = record.get('Примечания', '')
-                        updated_notes = f"{current_notes}\n{datetime.now().strftime('%Y-%m-%d %H:%M')}: {notes}"
-                        self.worksheet.update_cell(idx, 9, updated_notes)  # Колонка "Примечания"
-                    
-                    logger.info(f"Updated lead status: {phone} -> {status}")
-                    return True
+            idx = leads[0]['row']
+            if not await self.verify_row(idx):
+                return False
+            # Обновляем статус и примечания
+            await self.call(self.worksheet.update_cell, idx, 8, status)  # Колонка "Статус"
+            self.index.set_status(idx, status)
+            if notes:
+                current_notes = (await self.call(self.worksheet.cell, idx, 9)).value or ''
+                updated_notes = f"{current_notes}\n{datetime.now().strftime('%Y-%m-%d %H:%M')}: {notes}"
+                await self.call(self.worksheet.update_cell, idx, 9, updated_notes)  # Колонка "Примечания"
             
-            logger.warning(f"Lead not found for phone: {phone}")
-            return False
+            logger.info(f"Updated lead status: {phone} -> {status}")
+            return True
             
         except Exception as e:
             logger.error(f"Failed to update lead status: {e}")
             return False
     
+    async def update_lead_status(self, row: int, status: str) -> bool:
+        """Обновление статуса лида по номеру строки"""
+        if not self.worksheet or row not in self.index.leads:
+            return False
+        
+        try:
+            if not await self.verify_row(row):
+                return False
+            await self.call(self.worksheet.update_cell, row, 8, status)  # Колонка "Статус"
+            self.index.set_status(row, status)
+            logger.info(f"Updated lead status: row {row} -> {status}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update lead status: {e}")
+            return False
+    
+    async def verify_row(self, row: int) -> bool:
+        """Проверка, что в строке таблицы все еще лид из индекса
+        
+        Строки могли удалить или отсортировать вручную. При несовпадении
+        телефона или user_id индекс перестраивается, а изменение отменяется.
+        """
+        lead = self.index.leads.get(row)
+        if not lead:
+            return False
+        
+        values = await self.call(self.worksheet.row_values, row)
+        values += [''] * (7 - len(values))
+        # Колонки "Телефон" и "User ID"
+        if (normalize_phone(values[2]) == normalize_phone(lead.get('phone', ''))
+                and str(values[6]) == str(lead.get('user_id', ''))):
+            return True
+        
+        logger.warning(f"Lead row {row} changed in the sheet, rebuilding index")
+        await self.refresh_index()
+        return False
+    
+    def has_lead(self, lead_data: Dict[str, Any]) -> bool:
+        """Есть ли лид в индексе: совпадают время создания и телефон"""
+        return any(str(lead['date']) == lead_data.get('created_at')
+                   for lead in self.index.find_by_phone(lead_data.get('phone', '')))
+    
+    async def refresh_index(self):
+        """Перечитывание таблицы и перестроение индекса"""
+        await self.load_index(await self.call(self.worksheet.get_all_records))
+    
     async def get_leads_count(self) -> int:
         """Получение количества лидов"""
         try:
             if not self.worksheet:
                 return 0
-            return len(self.worksheet.get_all_records())
+            return len(await self.call(self.worksheet.get_all_records))
         except Exception as e:
             logger.error(f"Failed to get leads count: {e}")
             return 0
 
-# Глобальный экземпляр менеджера
-sheets_manager: Optional[GoogleSheetsManager] = None
-
-async def init_google_sheets():
-    """Инициализация Google Sheets"""
-    global sheets_manager
+class SheetsService:
+    """Лиды одного бота: таблица, предохранитель, локальная очередь и статистика
     
-    credentials_path = os.getenv('GOOGLE_CREDENTIALS_PATH', 'google_credentials.json')
-    spreadsheet_name = os.getenv('GOOGLE_SPREADSHEET_NAME', 'SignContract Leads')
+    В многопроцессном режиме (shard - номер воркера) у каждого воркера
+    своя очередь spool_path.<shard>. Воркер 0 или единственный процесс
+    забирает очереди воркеров, которых больше нет (после уменьшения WORKERS).
+    """
     
-    sheets_manager = GoogleSheetsManager(credentials_path, spreadsheet_name)
-    success = await sheets_manager.init_connection()
+    def __init__(self, credentials_path: str, spreadsheet_name: str,
+                 spool_path: str = LEAD_SPOOL_PATH, name: str = 'google_sheets',
+                 index_ttl: float = 0, shard: Optional[int] = None, workers: int = 1):
+        self.credentials_path = credentials_path
+        self.spreadsheet_name = spreadsheet_name
+        self.base_spool_path = spool_path
+        self.spool_path = spool_path if shard is None else f"{spool_path}.{shard}"
+        self.shard = shard
+        self.workers = workers
+        self.breaker = make_breaker(name)
+        self.manager: Optional[GoogleSheetsManager] = None
+        self.initializing = False
+        # Неудачные пробы подряд, после RECONNECT_AFTER - переподключение
+        self.failed_probes = 0
+        # 0 - индекс ведет только этот процесс, иначе он перечитывается
+        # из таблицы, если старше index_ttl секунд
+        self.index_ttl = index_ttl
+        self.index_synced_at = 0.0
+        # Последняя успешно полученная статистика и время ее получения
+        self.last_statistics: Optional[Dict[str, Any]] = None
     
-    if success:
-        logger.info("Google Sheets integration ready")
-    else:
-        logger.error("Google Sheets integration failed")
-        sheets_manager = None
+    async def init(self):
+        """Инициализация Google Sheets"""
+        manager = GoogleSheetsManager(self.credentials_path, self.spreadsheet_name, self.breaker)
+        self.initializing = True
+        try:
+            success = await manager.init_connection()
+        finally:
+            self.initializing = False
+        
+        if success:
+            self.manager = manager
+            self.failed_probes = 0
+            self.index_synced_at = time.monotonic()
+            logger.info(f"Google Sheets integration ready: {self.spreadsheet_name}")
+        else:
+            # Прежний менеджер (если был) остается: его индекс продолжает обслуживать поиск
+            logger.error(f"Google Sheets integration failed: {self.spreadsheet_name}")
+        
+        return success
     
-    return success
-
-async def save_lead_to_sheets(user_data: Dict[str, Any], name: str, phone: str, action: str):
-    """Сохранение лида в Google Sheets"""
-    if not sheets_manager:
-        logger.error("Google Sheets not initialized")
-        return False
+    async def probe(self) -> bool:
+        """Пробный запрос через предохранитель: переводит его в half-open без трафика пользователей"""
+        try:
+            await self.manager.call(self.manager.worksheet.get_values, 'A1')
+        except CircuitOpenError:
+            return False
+        except Exception as e:
+            self.failed_probes += 1
+            logger.warning(f"Sheets probe failed ({self.failed_probes}): {e!r}")
+            return False
+        
+        self.failed_probes = 0
+        return True
     
-    lead_data = {
-        'name': name,
-        'phone': phone,
-        'segment': user_data.get('segment', 'unknown'),
-        'action': action,
-        'username': user_data.get('username', ''),
-        'user_id': user_data.get('user_id', ''),
-    }
+    def spool_lead(self, lead_data: Dict[str, Any]) -> bool:
+        """Сохранение лида в локальную очередь"""
+        try:
+            with open(self.spool_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(lead_data, ensure_ascii=False) + '\n')
+            logger.warning(f"Lead spooled locally: {lead_data.get('name', 'Unknown')}")
+            return True
+        except OSError as e:
+            logger.error(f"Failed to spool lead: {e}")
+            return False
     
-    return await sheets_manager.add_lead(lead_data)
-
-# async def update_lead_status_in_sheets(phone: str, status: str, notes: str = ""):
-#     """Обновление статуса лида в Google Sheets"""
-#     if not sheets_manager:
-#         return False
+    def orphan_spools(self) -> List[str]:
+        """Очереди лидов, которые больше не отправит ни один процесс
+        
+        Для единственного процесса - очереди всех воркеров, для воркера 0 -
+        очереди воркеров с номером >= workers и очередь однопроцессного режима.
+        """
+        if self.shard not in (None, 0):
+            return []
+        
+        base = self.base_spool_path
+        orphans = set()
+        if self.shard == 0 and (os.path.exists(base) or os.path.exists(base + '.replay')):
+            orphans.add(base)
+        for path in glob.glob(glob.escape(base) + '.*'):
+            suffix = path[len(base) + 1:]
+            if suffix.endswith('.replay'):
+                suffix = suffix[:-len('.replay')]
+            if suffix.isdigit() and (self.shard is None or int(suffix) >= self.workers):
+                orphans.add(f"{base}.{suffix}")
+        return sorted(orphans)
     
-#     return await sheets_manager.update_lead_status(phone, status, notes)
-
-
-async def get_leads_statistics():
-    """Получение статистики лидов"""
-    if not sheets_manager:
-        return None
+    async def replay_spool(self) -> int:
+        """Отправка лидов из своей локальной очереди и из брошенных очередей"""
+        sent = await self._replay_file(self.spool_path)
+        for path in self.orphan_spools():
+            logger.warning(f"Replaying lead spool left by another worker: {path}")
+            sent += await self._replay_file(path)
+        return sent
     
-    try:
-        # all records тип List[Dict[str,Union[int,float,str]]]
-        # dict {} key-value
-        # list [] mutable
-        # tuple () immutable
-        # Union значит либо int , libo float , libo str
-        # Union(str,None) libo str libo None, mozhno ispolzovat Optional(str) libo str,libo None
-        all_records = sheets_manager.worksheet.get_all_records()
+    async def _replay_file(self, spool_path: str) -> int:
+        """Отправка лидов из одной очереди, неотправленные переносятся в свою очередь"""
+        replay_path = spool_path + '.replay'
+        
+        # Очередь переносится в отдельный файл, чтобы новые лиды
+        # во время отправки писались в свежую очередь
+        if not os.path.exists(replay_path):
+            if not os.path.exists(spool_path):
+                return 0
+            os.replace(spool_path, replay_path)
         
-        # Dict[segmnet(str),count(int)]
-        segments = {}
-        actions = {}
-        statuses = {}
+        with open(replay_path, encoding='utf-8') as f:
+            pending = [json.loads(line) for line in f if line.strip()]
         
-        for record in all_records:
-            segment = record.get('Сегмент', 'unknown')
-            segments[segment] = segments.get(segment, 0) + 1
+        # Лиды с неизвестным исходом записи проверяются по свежей таблице
+        # и отправляются, только если их там нет
+        deadline = (datetime.now() - timedelta(seconds=UNCONFIRMED_GRACE)).strftime('%Y-%m-%d %H:%M:%S')
+        unconfirmed = [lead_data for lead_data in pending if lead_data.get('unconfirmed')]
+        checked = False
+        if unconfirmed and self.manager:
+            try:
+                await self.manager.refresh_index()
+                checked = True
+            except Exception as e:
+                if not isinstance(e, CircuitOpenError):
+                    logger.error(f"Failed to check spooled leads: {e!r}")
+        
+        sent = 0
+        failed = False
+        kept = []
+        for lead_data in pending:
+            if lead_data.get('unconfirmed'):
+                if not checked or lead_data.get('created_at', '') > deadline:
+                    kept.append(lead_data)
+                    continue
+                if self.manager.has_lead(lead_data):
+                    logger.info(f"Spooled lead already in Google Sheets: {lead_data.get('name', 'Unknown')}")
+                    continue
+                lead_data = {k: v for k, v in lead_data.items() if k != 'unconfirmed'}
             
-            action = record.get('Действие', 'unknown')
-            actions[action] = actions.get(action, 0) + 1
+            # После первой ошибки остальные лиды ждут следующего прохода
+            if failed or not self.manager:
+                kept.append(lead_data)
+                continue
             
-            status = record.get('Статус', 'unknown')
-            statuses[status] = statuses.get(status, 0) + 1
+            result = await self.manager.add_lead(lead_data)
+            if result:
+                sent += 1
+                continue
+            failed = True
+            kept.append(lead_data if result is False else dict(lead_data, unconfirmed=True))
+        
+        # Неотправленные лиды возвращаются в очередь
+        for lead_data in kept:
+            self.spool_lead(lead_data)
+        os.remove(replay_path)
         
-        # Dict[str,dict[str,int]]
-        return {
-            'total_leads': len(all_records),
-            'by_segment': segments,
-            'by_action': actions,
-            'by_status': statuses
+        if sent:
+            logger.info(f"Replayed {sent} spooled leads to Google Sheets")
+        return sent
+    
+    async def save_lead(self, user_data: Dict[str, Any], name: str, phone: str, action: str):
+        """Сохранение лида в Google Sheets, при недоступности - в локальную очередь"""
+        lead_data = {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'name': name,
+            'phone': phone,
+            'segment': user_data.get('segment', 'unknown'),
+            'action': action,
+            'username': user_data.get('username', ''),
+            'user_id': user_data.get('user_id', ''),
         }
         
-    except Exception as e:
-        logger.error(f"Failed to get statistics: {e}")
-        return None
-    
\ No newline at end of file
+        result = await self.manager.add_lead(lead_data) if self.manager else False
+        if result:
+            return True
+        
+        # При таймауте строка могла записаться: такой лид в очереди
+        # помечается и перед повторной отправкой сверяется с таблицей
+        if result is None:
+            lead_data['unconfirmed'] = True
+        return self.spool_lead(lead_data)
+    
+    async def watchdog(self, interval: float = 15):
+        """Переподключение к Google Sheets и отправка очереди после сбоя
+
+        Пока предохранитель разомкнут, watchdog сам отправляет пробный
+        запрос, не дожидаясь трафика пользователей. После RECONNECT_AFTER
+        неудачных проб подряд подключение создается заново.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self.initializing:
+                    continue
+                if not self.manager or self.failed_probes >= RECONNECT_AFTER:
+                    # Подключение идет через предохранитель и само служит пробой
+                    await self.init()
+                elif self.breaker.state != CLOSED:
+                    await self.probe()
+                if self.manager and self.breaker.state == CLOSED:
+                    await self.replay_spool()
+            except Exception as e:
+                logger.error(f"Sheets watchdog error: {e!r}")
+    
+    async def update_lead_status(self, row: int, status: str):
+        """Обновление статуса лида в Google Sheets"""
+        if not self.manager:
+            return False
+        
+        return await self.manager.update_lead_status(row, status)
+    
+    async def sync_index(self):
+        """Перечитывание индекса из таблицы, если его могли изменить другие воркеры"""
+        if not self.manager or not self.index_ttl:
+            return
+        if time.monotonic() - self.index_synced_at < self.index_ttl:
+            return
+        
+        try:
+            await self.manager.refresh_index()
+            self.index_synced_at = time.monotonic()
+        except Exception as e:
+            # Поиск продолжает работать по прежнему индексу
+            if not isinstance(e, CircuitOpenError):
+                logger.error(f"Failed to refresh lead index: {e!r}")
+    
+    def search_leads(self, query: str, limit: int = 10):
+        """Поиск лидов по локальному индексу"""
+        if not self.manager:
+            return None
+        
+        return self.manager.index.search(query, limit)
+    
+    def get_lead(self, row: int):
+        """Лид из локального индекса по номеру строки"""
+        if not self.manager:
+            return None
+        
+        return self.manager.index.leads.get(row)
+    
+    async def get_statistics(self):
+        """Получение статистики лидов
+        
+        Если Google Sheets недоступен, возвращается последний успешный
+        снимок с флагом stale.
+        """
+        if not self.manager:
+            return dict(self.last_statistics, stale=True) if self.last_statistics else None
+        
+        try:
+            # all records тип List[Dict[str,Union[int,float,str]]]
+            all_records = await self.manager.call(self.manager.worksheet.get_all_records)
+            
+            # Dict[segmnet(str),count(int)]
+            segments = {}
+            actions = {}
+            statuses = {}
+            
+            for record in all_records:
+                segment = record.get('Сегмент', 'unknown')
+                segments[segment] = segments.get(segment, 0) + 1
+                
+                action = record.get('Действие', 'unknown')
+                actions[action] = actions.get(action, 0) + 1
+                
+                status = record.get('Статус', 'unknown')
+                statuses[status] = statuses.get(status, 0) + 1
+            
+            # Dict[str,dict[str,int]]
+            self.last_statistics = {
+                'total_leads': len(all_records),
+                'by_segment': segments,
+                'by_action': actions,
+                'by_status': statuses,
+                'updated_at': datetime.now(),
+            }
+            return dict(self.last_statistics, stale=False)
+            
+        except Exception as e:
+            if not isinstance(e, CircuitOpenError):
+                logger.error(f"Failed to get statistics: {e!r}")
+            return dict(self.last_statistics, stale=True) if self.last_statistics else None
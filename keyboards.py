@@ -1,45 +1,50 @@
+from functools import lru_cache
+from types import ModuleType
+from typing import Dict
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-# Клавиатура для выбора сегмента пользователя
-def get_segment_keyboard() -> InlineKeyboardMarkup:
+# Статичные клавиатуры собираются один раз для модуля текстов бота
+# при первом вызове и дальше переиспользуются
+
+def build_keyboard(buttons: Dict[str, str]) -> InlineKeyboardMarkup:
+    """Клавиатура по кнопке в ряд из словаря callback_data -> текст"""
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="👨‍💼 Я Индивидуальный Предприниматель", callback_data="segment_ip")],
-        [InlineKeyboardButton(text="⚖️ Я юрист", callback_data="segment_lawyer")],
-        [InlineKeyboardButton(text="👥 Я HR-специалист", callback_data="segment_hr")],
-        [InlineKeyboardButton(text="🔄 Другое", callback_data="segment_other")]
+        [InlineKeyboardButton(text=text, callback_data=callback_data)]
+        for callback_data, text in buttons.items()
     ])
 
+# Клавиатура для выбора сегмента пользователя
+@lru_cache(maxsize=None)
+def get_segment_keyboard(texts: ModuleType) -> InlineKeyboardMarkup:
+    return build_keyboard(texts.SEGMENT_BUTTONS)
+
 # Главное меню бота
-def get_main_menu_keyboard() -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="❓ Как это работает?", callback_data="how_it_works")],
-        [InlineKeyboardButton(text="💼 Примеры клиентов", callback_data="case_studies")],
-        [InlineKeyboardButton(text="🤔 Ответы на вопросы", callback_data="faq")],
-        [InlineKeyboardButton(text="📄 Получить шаблон договора", callback_data="get_template")],
-        [InlineKeyboardButton(text="🎯 Заказать демонстрацию", callback_data="order_demo")],
-        [InlineKeyboardButton(text="❌ Выйти",callback_data="exit")]
-    ])
+@lru_cache(maxsize=None)
+def get_main_menu_keyboard(texts: ModuleType) -> InlineKeyboardMarkup:
+    return build_keyboard(texts.MAIN_MENU_BUTTONS)
 
 # Клавиатура для выбора кейсов
-def get_case_studies_keyboard() -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🎓 Образование", callback_data="case_education")],
-        [InlineKeyboardButton(text="🏠 Недвижимость", callback_data="case_realestate")],
-        [InlineKeyboardButton(text="💼 Услуги", callback_data="case_services")],
-        [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_menu")]
-    ])
+@lru_cache(maxsize=None)
+def get_case_studies_keyboard(texts: ModuleType) -> InlineKeyboardMarkup:
+    return build_keyboard(texts.CASE_STUDIES_BUTTONS)
 
 # Клавиатура для FAQ
-def get_faq_keyboard() -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⚖️ Законно ли это?", callback_data="faq_legal")],
-        [InlineKeyboardButton(text="🔐 Нужна ли ЭЦП?", callback_data="faq_ecp")],
-        [InlineKeyboardButton(text="🛡 Безопасно ли?", callback_data="faq_security")],
-        [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_menu")]
-    ])
+@lru_cache(maxsize=None)
+def get_faq_keyboard(texts: ModuleType) -> InlineKeyboardMarkup:
+    return build_keyboard(texts.FAQ_BUTTONS)
 
 # Кнопка "Назад в меню"
-def get_back_keyboard() -> InlineKeyboardMarkup:
+@lru_cache(maxsize=None)
+def get_back_keyboard(texts: ModuleType) -> InlineKeyboardMarkup:
+    return build_keyboard(texts.BACK_BUTTONS)
+
+# Статусы лида - значения колонки "Статус" в таблице, общие для всех ботов
+LEAD_STATUSES = ['Новый', 'В работе', 'Закрыт', 'Отказ']
+
+# Кнопки смены статуса лида для админа
+def get_lead_status_keyboard(row: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⬅️ Назад в меню", callback_data="back_to_menu")]
-    ])
\ No newline at end of file
+        [InlineKeyboardButton(text=status, callback_data=f"lead_status_{row}_{idx}")
+         for idx, status in enumerate(LEAD_STATUSES)]
+    ])
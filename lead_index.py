@@ -0,0 +1,206 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def normalize_phone(phone: Any) -> str:
+    """Только цифры номера, 8XXXXXXXXXX приводится к 7XXXXXXXXXX"""
+    digits = re.sub(r'\D', '', str(phone))
+    if len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    return digits
+
+
+# Для префиксов до такой длины хранятся готовые списки строк
+PREFIX_DEPTH = 3
+# Диапазон ключей, который дешевле просмотреть целиком, чем обходить список строк
+SCAN_LIMIT = 256
+
+
+class PrefixIndex:
+    """Поиск самых новых строк по префиксу ключа
+
+    Ключи лежат в отсортированном списке пар (ключ, номер строки). Для
+    каждого префикса длиной до PREFIX_DEPTH хранится возрастающий список
+    строк, поэтому короткий запрос отдает хвост готового списка, не
+    перебирая все совпадения.
+    """
+
+    def __init__(self):
+        self.keys: List[Tuple[str, int]] = []
+        self.by_row: Dict[int, str] = {}
+        self.prefixes: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, row: int, sort: bool = True):
+        """Добавление ключа; при sort=False списки нужно упорядочить через sort()"""
+        self.by_row[row] = key
+        if sort:
+            insort(self.keys, (key, row))
+        else:
+            self.keys.append((key, row))
+        for length in range(1, min(len(key), PREFIX_DEPTH) + 1):
+            rows = self.prefixes.setdefault(key[:length], [])
+            if sort and rows and rows[-1] > row:
+                insort(rows, row)
+            else:
+                rows.append(row)
+
+    def sort(self):
+        self.keys.sort()
+        for rows in self.prefixes.values():
+            rows.sort()
+
+    def remove(self, row: int):
+        key = self.by_row.pop(row, None)
+        if key is None:
+            return
+        idx = bisect_left(self.keys, (key, row))
+        if idx < len(self.keys) and self.keys[idx] == (key, row):
+            del self.keys[idx]
+        for length in range(1, min(len(key), PREFIX_DEPTH) + 1):
+            rows = self.prefixes[key[:length]]
+            idx = bisect_left(rows, row)
+            if idx < len(rows) and rows[idx] == row:
+                del rows[idx]
+            if not rows:
+                del self.prefixes[key[:length]]
+
+    def search(self, prefix: str, limit: int) -> List[int]:
+        """limit самых новых (с большим номером строки) ключей с префиксом"""
+        if not prefix:
+            return []
+        rows = self.prefixes.get(prefix[:PREFIX_DEPTH], [])
+        if len(prefix) <= PREFIX_DEPTH:
+            return rows[:-limit - 1:-1]
+
+        # Все ключи с префиксом лежат между prefix и следующей за ним строкой
+        start = bisect_left(self.keys, (prefix, -1))
+        end = bisect_left(self.keys, (prefix[:-1] + chr(ord(prefix[-1]) + 1), -1), start)
+        if end - start <= SCAN_LIMIT:
+            return heapq.nlargest(limit, (row for _, row in self.keys[start:end]))
+
+        # Совпадений много: идем по строкам короткого префикса от новых к старым
+        result = []
+        for row in reversed(rows):
+            if self.by_row[row].startswith(prefix):
+                result.append(row)
+                if len(result) == limit:
+                    break
+        return result
+
+
+class LeadIndex:
+    """Локальный поисковый индекс лидов
+
+    Точный поиск по телефону и user_id через словари, поиск по префиксу
+    имени и username через PrefixIndex.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # номер строки в таблице -> лид
+        self.leads: Dict[int, Dict[str, Any]] = {}
+        self.by_phone: Dict[str, List[int]] = {}
+        self.by_user_id: Dict[str, List[int]] = {}
+        # ключи в нижнем регистре
+        self.names = PrefixIndex()
+        self.usernames = PrefixIndex()
+
+    def __len__(self) -> int:
+        return len(self.leads)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, Dict[str, Any]]]) -> 'LeadIndex':
+        """Индекс по всем строкам таблицы сразу: списки сортируются один раз в конце
+
+        Номера строк должны быть уникальны.
+        """
+        index = cls()
+        for row, lead in rows:
+            index._insert(row, lead, sort=False)
+        index.names.sort()
+        index.usernames.sort()
+        return index
+
+    def add(self, row: int, lead: Dict[str, Any]):
+        """Добавление лида из строки таблицы row"""
+        if row in self.leads:
+            self.remove(row)
+        self._insert(row, lead, sort=True)
+
+    def _insert(self, row: int, lead: Dict[str, Any], sort: bool):
+        lead = dict(lead, row=row)
+        self.leads[row] = lead
+
+        phone = normalize_phone(lead.get('phone', ''))
+        if phone:
+            self.by_phone.setdefault(phone, []).append(row)
+
+        user_id = str(lead.get('user_id', '') or '')
+        if user_id:
+            self.by_user_id.setdefault(user_id, []).append(row)
+
+        name = str(lead.get('name', '') or '').lower()
+        if name:
+            self.names.add(name, row, sort)
+
+        username = str(lead.get('username', '') or '').lower().lstrip('@')
+        if username:
+            self.usernames.add(username, row, sort)
+
+    def remove(self, row: int):
+        lead = self.leads.pop(row, None)
+        if not lead:
+            return
+
+        for mapping, key in ((self.by_phone, normalize_phone(lead.get('phone', ''))),
+                             (self.by_user_id, str(lead.get('user_id', '') or ''))):
+            rows = mapping.get(key)
+            if rows and row in rows:
+                rows.remove(row)
+                if not rows:
+                    del mapping[key]
+
+        self.names.remove(row)
+        self.usernames.remove(row)
+
+    def set_status(self, row: int, status: str) -> Optional[Dict[str, Any]]:
+        lead = self.leads.get(row)
+        if lead is not None:
+            lead['status'] = status
+        return lead
+
+    def find_by_phone(self, phone: str) -> List[Dict[str, Any]]:
+        return [self.leads[row] for row in self.by_phone.get(normalize_phone(phone), [])]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Поиск по телефону, user_id, @username или префиксу имени/username"""
+        query = query.strip()
+        if not query:
+            return []
+
+        rows: List[int] = []
+        digits = normalize_phone(query)
+        if query.startswith('@'):
+            rows = self.usernames.search(query[1:].lower(), limit)
+        elif digits and re.fullmatch(r'[\d\s\-+()]+', query):
+            rows = self.by_phone.get(digits, []) + self.by_user_id.get(re.sub(r'\D', '', query), [])
+        else:
+            prefix = query.lower()
+            rows = self.names.search(prefix, limit) + self.usernames.search(prefix, limit)
+
+        seen = set()
+        result = []
+        for row in rows:
+            if row not in seen:
+                seen.add(row)
+                result.append(self.leads[row])
+        # Новые лиды первыми
+        result.sort(key=lambda lead: lead['row'], reverse=True)
+        return result[:limit]
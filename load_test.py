@@ -0,0 +1,149 @@
+"""Нагрузочный тест многопроцессного режима
+
+Запускает 1..N воркеров (sharding.run_worker) с сессией-заглушкой без
+обращения к Telegram, раздает им по user_id синтетические апдейты
+(/start, выбор сегмента, разделы меню, FAQ) и выводит пропускную
+способность в апдейтах в секунду для каждого числа воркеров.
+
+    python load_test.py --workers 4 --updates 20000 --users 2000 --latency 0.05
+
+--latency - задержка ответа Bot API в секундах. Google Sheets в тесте
+недоступен, лиды не отправляются. С --output результат дописывается
+строкой JSON, как в startup_bench.py.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BOT_ID = 123456
+
+# Путь пользователя по боту, апдейты идут по кругу
+SCENARIO = [
+    ('message', '/start'),
+    ('callback', 'segment_ip'),
+    ('callback', 'how_it_works'),
+    ('callback', 'back_to_menu'),
+    ('callback', 'faq'),
+    ('callback', 'faq_legal'),
+    ('callback', 'case_studies'),
+    ('callback', 'case_education'),
+    ('message', '/menu'),
+]
+
+
+def make_updates(count: int, users: int) -> list:
+    """(user_id, сырой апдейт): пользователи по очереди проходят сценарий"""
+    from stub_session import callback_update, message_update
+
+    updates = []
+    for update_id in range(1, count + 1):
+        user_id = 1000 + update_id % users
+        kind, value = SCENARIO[(update_id // users) % len(SCENARIO)]
+        if kind == 'message':
+            raw = message_update(update_id, user_id, value)
+        else:
+            raw = callback_update(update_id, user_id, value, BOT_ID)
+        updates.append((user_id, raw))
+    return updates
+
+
+def bench_worker(index: int, queue, latency: float, finished):
+    """Воркер с сессией-заглушкой вместо aiohttp
+
+    В finished кладется время окончания обработки, без завершения интерпретатора.
+    """
+    import asyncio
+    import logging
+
+    logging.basicConfig(level=logging.ERROR, format=f"[worker-{index}] %(levelname)s:%(name)s:%(message)s")
+    # Google Sheets в тесте недоступен, ошибки подключения ожидаемы
+    logging.getLogger('google_sheets').setLevel(logging.CRITICAL)
+
+    from sharding import run_worker
+    from stub_session import StubSession
+
+    asyncio.run(run_worker(index, queue, session=StubSession(latency=latency)))
+    finished.put(time.time())
+
+
+def run_once(workers: int, updates: list, latency: float) -> float:
+    """Время обработки всех апдейтов заданным числом воркеров, секунды"""
+    context = multiprocessing.get_context('spawn')
+    # Воркеры читают WORKERS из окружения: по нему воркер 0 ищет брошенные очереди лидов
+    os.environ['WORKERS'] = str(workers)
+    queues = [context.Queue() for _ in range(workers)]
+    finished = context.Queue()
+    processes = [context.Process(target=bench_worker, args=(index, queues[index], latency, finished), daemon=True)
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+
+    # Прогрев: воркер готов, когда забрал свой первый апдейт из очереди
+    for index, queue in enumerate(queues):
+        queue.put((BOT_ID, index, updates[index][1]))
+    while not all(queue.empty() for queue in queues):
+        time.sleep(0.05)
+    time.sleep(0.5)
+
+    started = time.time()
+    for user_id, raw in updates:
+        queues[user_id % workers].put((BOT_ID, user_id, raw))
+    for queue in queues:
+        queue.put(None)
+    for process in processes:
+        process.join()
+
+    if any(process.exitcode for process in processes):
+        raise RuntimeError(f"Worker failed: exit codes {[process.exitcode for process in processes]}")
+    return max(finished.get() for _ in processes) - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='максимум воркеров')
+    parser.add_argument('--updates', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка Bot API, секунды')
+    parser.add_argument('--output', help='JSONL-файл для истории результатов')
+    args = parser.parse_args()
+
+    # Файлы воронки, очереди лидов и кэша медиа - во временном каталоге
+    data_dir = tempfile.mkdtemp(prefix='load_test_')
+    os.environ.update(
+        BOT_TOKEN=f"{BOT_ID}:load-test",
+        TENANTS_CONFIG='',
+        FUNNEL_LOG_PATH=os.path.join(data_dir, 'funnel_events.bin'),
+        LEAD_SPOOL_PATH=os.path.join(data_dir, 'leads_spool.jsonl'),
+        MEDIA_CACHE_PATH=os.path.join(data_dir, 'media_cache.json'),
+        GOOGLE_CREDENTIALS_PATH=os.path.join(data_dir, 'missing.json'),
+        GOOGLE_CREDENTIALS_JSON='',
+    )
+    sys.path.insert(0, HERE)
+    os.chdir(HERE)
+
+    updates = make_updates(args.updates, args.users)
+    results = {}
+    for workers in range(1, args.workers + 1):
+        elapsed = run_once(workers, updates, args.latency)
+        results[workers] = round(len(updates) / elapsed, 1)
+        print(f"{workers:>2} worker(s) {results[workers]:10.1f} updates/s ({elapsed:.2f} s)")
+
+    if args.output:
+        revision = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=HERE,
+                                  capture_output=True, text=True).stdout.strip()
+        record = dict(updates_per_second=results, updates=args.updates, users=args.users, latency=args.latency,
+                      cpus=os.cpu_count(), revision=revision, python=sys.version.split()[0],
+                      date=datetime.now().isoformat(timespec='seconds'))
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
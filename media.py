@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+logger = logging.getLogger(__name__)
+
+# Ответы Telegram, означающие, что сохраненный file_id больше не действителен
+FILE_ID_ERRORS = (
+    'wrong file identifier',
+    'wrong remote file identifier',
+    'file reference expired',
+    'file_reference_expired',
+)
+
+
+def is_file_id_error(error: TelegramBadRequest) -> bool:
+    message = str(error.message).lower()
+    return any(text in message for text in FILE_ID_ERRORS)
+
+
+class MediaLibrary:
+    """Отправка файлов через кэш Telegram file_id
+
+    Каждый файл загружается в Telegram один раз, полученный file_id
+    сохраняется в JSON-кэш по sha256 содержимого и дальше переиспользуется.
+    Изменение файла меняет хэш, и файл загружается заново.
+
+    Кэш общий для воркеров: перед записью file_id, сохраненные другими
+    процессами, подмешиваются из файла, а перед загрузкой файла кэш
+    перечитывается.
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        # ключ -> (путь, тип: photo | document, sha256)
+        self.files: Dict[str, tuple] = {}
+        self.file_ids: Dict[str, str] = {}
+        # Отвергнутые Telegram file_id: при слиянии с файлом не возвращаются
+        self.evicted: Dict[str, str] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.load_cache()
+
+    def _read_cache(self) -> Dict[str, str]:
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load media cache: {e}")
+            return {}
+
+    def load_cache(self):
+        self.file_ids = self._read_cache()
+
+    def merge_cache(self):
+        """Подмешивание file_id, сохраненных другими процессами"""
+        merged = self._read_cache()
+        for sha256, file_id in self.evicted.items():
+            if merged.get(sha256) == file_id:
+                del merged[sha256]
+        merged.update(self.file_ids)
+        self.file_ids = merged
+
+    def save_cache(self):
+        # Свой временный файл у каждого процесса, иначе воркеры затирают его друг у друга
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        self.merge_cache()
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.file_ids, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.error(f"Failed to save media cache: {e}")
+
+    def register(self, key: str, path: str, kind: str = 'document'):
+        """Регистрация файла для отправки"""
+        if not os.path.isfile(path):
+            logger.warning(f"Media file not found: {path}")
+            return
+
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                sha256.update(chunk)
+
+        self.files[key] = (path, kind, sha256.hexdigest())
+        self.locks[key] = asyncio.Lock()
+
+    def register_dir(self, prefix: str, directory: str, kind: str = 'document') -> List[str]:
+        """Регистрация всех файлов каталога, ключи вида prefix:имя_файла"""
+        if not os.path.isdir(directory):
+            logger.warning(f"Media directory not found: {directory}")
+            return []
+
+        keys = []
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                key = f"{prefix}:{name}"
+                self.register(key, path, kind)
+                keys.append(key)
+        if not keys:
+            logger.warning(f"Media directory is empty: {directory}")
+        return keys
+
+    def keys(self, prefix: str) -> List[str]:
+        return [key for key in self.files if key.startswith(f"{prefix}:")]
+
+    @staticmethod
+    def _file_id(message: Message, kind: str) -> Optional[str]:
+        if kind == 'photo':
+            return message.photo[-1].file_id if message.photo else None
+        return message.document.file_id if message.document else None
+
+    async def _send(self, bot: Bot, chat_id: int, kind: str, media, **kwargs) -> Message:
+        if kind == 'photo':
+            return await bot.send_photo(chat_id, photo=media, **kwargs)
+        return await bot.send_document(chat_id, document=media, **kwargs)
+
+    async def send(self, bot: Bot, chat_id: int, key: str, **kwargs) -> Optional[Message]:
+        """Отправка файла по ключу, загрузка только при отсутствии file_id"""
+        if key not in self.files:
+            logger.error(f"Unknown media key: {key}")
+            return None
+
+        path, kind, sha256 = self.files[key]
+
+        file_id = self.file_ids.get(sha256)
+        if file_id:
+            try:
+                return await self._send(bot, chat_id, kind, file_id, **kwargs)
+            except TelegramBadRequest as e:
+                # file_id мог стать недействительным (например, сменился токен бота);
+                # остальные ошибки (чат, подпись, разметка) к кэшу отношения не имеют
+                if not is_file_id_error(e):
+                    raise
+                logger.warning(f"Cached file_id rejected for {key}: {e}")
+                self.evicted[sha256] = self.file_ids.pop(sha256, file_id)
+
+        async with self.locks[key]:
+            # Пока ждали блокировку, файл мог загрузить другой запрос или воркер
+            if sha256 not in self.file_ids:
+                self.merge_cache()
+            file_id = self.file_ids.get(sha256)
+            if file_id:
+                return await self._send(bot, chat_id, kind, file_id, **kwargs)
+
+            message = await self._send(bot, chat_id, kind, FSInputFile(path), **kwargs)
+            file_id = self._file_id(message, kind)
+            if file_id:
+                self.file_ids[sha256] = file_id
+                self.save_cache()
+                logger.info(f"Uploaded media {key}")
+            return message
+
+    async def prewarm(self, bot: Bot, chat_id: int) -> int:
+        """Загрузка всех файлов без file_id через служебный чат"""
+        uploaded = 0
+        for key, (_, _, sha256) in self.files.items():
+            if sha256 in self.file_ids:
+                continue
+            try:
+                message = await self.send(bot, chat_id, key, disable_notification=True)
+                if message:
+                    await bot.delete_message(chat_id, message.message_id)
+                    uploaded += 1
+            except Exception as e:
+                logger.error(f"Failed to prewarm media {key}: {e}")
+        return uploaded
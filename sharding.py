@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import multiprocessing
+import queue as queue_module
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Update
+
+from tenant import Tenant, load_tenants
+
+logger = logging.getLogger(__name__)
+
+# Больше перезапусков воркеров за окно - фронт останавливается с ошибкой
+MAX_RESTARTS = 5
+RESTART_WINDOW = 60.0
+
+
+def user_key(update: Update) -> int:
+    """Ключ шардирования: user_id, для апдейтов без пользователя - chat_id"""
+    try:
+        event = update.event
+    except Exception:
+        return update.update_id
+
+    from_user = getattr(event, 'from_user', None)
+    if from_user:
+        return from_user.id
+    chat = getattr(event, 'chat', None)
+    if chat:
+        return chat.id
+    return update.update_id
+
+
+async def poll_tenant(tenant: Tenant, queues: List[Any]):
+    """Long polling одного бота и раздача апдейтов по воркерам"""
+    offset = None
+    while True:
+        try:
+            updates = await tenant.bot.get_updates(offset=offset, timeout=30)
+        except Exception as e:
+            logger.error(f"Polling error for {tenant.name}: {e!r}")
+            await asyncio.sleep(5)
+            continue
+
+        for update in updates:
+            offset = update.update_id + 1
+            key = user_key(update)
+            raw = update.model_dump(mode='json', by_alias=True, exclude_none=True)
+            queues[key % len(queues)].put((tenant.bot.id, key, raw))
+
+
+def start_worker(context: Any, index: int, queue: Any) -> Any:
+    process = context.Process(target=worker_main, args=(index, queue), name=f"worker-{index}", daemon=True)
+    process.start()
+    return process
+
+
+async def supervise(context: Any, processes: List[Any], queues: List[Any], interval: float = 1.0):
+    """Перезапуск упавших воркеров
+
+    Воркер получает новую очередь, в нее переносятся апдейты, оставшиеся
+    в старой (старая могла остаться заблокированной упавшим процессом).
+    Апдейты, которые воркер успел взять, теряются. Если воркеры падают
+    чаще MAX_RESTARTS раз за RESTART_WINDOW секунд, фронт завершается
+    с ошибкой, а не перезапускает их бесконечно.
+    """
+    restarts = deque()
+    while True:
+        await asyncio.sleep(interval)
+        for index, process in enumerate(processes):
+            if process.is_alive():
+                continue
+
+            logger.error(f"Worker {index} died with exit code {process.exitcode}")
+            now = time.monotonic()
+            restarts.append(now)
+            while now - restarts[0] > RESTART_WINDOW:
+                restarts.popleft()
+            if len(restarts) > MAX_RESTARTS:
+                raise RuntimeError(f"Workers died {len(restarts)} times in {RESTART_WINDOW:.0f}s, stopping")
+
+            old_queue, queues[index] = queues[index], context.Queue()
+            try:
+                while True:
+                    queues[index].put(old_queue.get_nowait())
+            except queue_module.Empty:
+                pass
+
+            processes[index] = start_worker(context, index, queues[index])
+            logger.info(f"Worker {index} restarted")
+
+
+async def run_front(workers: int):
+    """Фронт: получает апдейты и распределяет их по воркерам по user_id
+
+    Все апдейты одного пользователя попадают в один воркер, поэтому
+    порядок и состояние FSM пользователя сохраняются. Воркеры общего
+    состояния не имеют, кроме FSM-хранилища (FSM_STORAGE).
+    """
+    context = multiprocessing.get_context('spawn')
+    queues = [context.Queue() for _ in range(workers)]
+    processes = [start_worker(context, index, queues[index]) for index in range(workers)]
+
+    session = AiohttpSession()
+    tenants = load_tenants(session)
+    for tenant in tenants:
+        await tenant.bot.delete_webhook(drop_pending_updates=True)
+
+    logger.info(f"Front started: {len(tenants)} bot(s), {workers} workers")
+    try:
+        await asyncio.gather(supervise(context, processes, queues),
+                             *(poll_tenant(tenant, queues) for tenant in tenants))
+    finally:
+        for queue in queues:
+            queue.put(None)
+        for process in processes:
+            process.join(timeout=10)
+        await session.close()
+
+
+def worker_main(index: int, queue: Any):
+    """Точка входа процесса-воркера"""
+    logging.basicConfig(level=logging.INFO, format=f"[worker-{index}] %(levelname)s:%(name)s:%(message)s")
+    try:
+        asyncio.run(run_worker(index, queue))
+    except KeyboardInterrupt:
+        pass
+
+
+async def run_worker(index: int, queue: Any, session: Optional[BaseSession] = None):
+    """Обработка апдейтов своего шарда через общий диспетчер бота
+
+    session - сессия Bot API, по умолчанию aiohttp (нагрузочный тест
+    передает заглушку без сети).
+    """
+    from bot import dp, start_tenants, stop_tenants
+
+    session = session or AiohttpSession()
+    tenants = load_tenants(session, shard=index)
+    bots = {tenant.bot.id: tenant.bot for tenant in tenants}
+    # Файлы прогревает только один воркер
+    tasks = await start_tenants(tenants, prewarm=index == 0)
+
+    # Последняя задача каждого пользователя: апдейты пользователя
+    # обрабатываются строго по очереди, разных пользователей - параллельно
+    chains: Dict[int, asyncio.Task] = {}
+
+    async def handle(previous, bot, raw):
+        if previous:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            await dp.feed_raw_update(bot, raw)
+        except Exception as e:
+            logger.error(f"Error handling update: {e!r}")
+
+    def release(key, task):
+        if chains.get(key) is task:
+            del chains[key]
+
+    loop = asyncio.get_running_loop()
+    logger.info(f"Worker {index} started")
+    try:
+        while True:
+            item = await loop.run_in_executor(None, queue.get)
+            if item is None:
+                break
+
+            bot_id, key, raw = item
+            task = asyncio.create_task(handle(chains.get(key), bots[bot_id], raw))
+            chains[key] = task
+            task.add_done_callback(lambda task, key=key: release(key, task))
+
+        if chains:
+            await asyncio.gather(*chains.values(), return_exceptions=True)
+    finally:
+        await stop_tenants(tenants, tasks)
+        await session.close()
@@ -0,0 +1,44 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """Замер фаз запуска бота
+
+    Отсчет идет с первого импорта этого модуля, поэтому в bot.py
+    он импортируется первым. mark(name) закрывает фазу, начавшуюся
+    с предыдущей отметки.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases: List[Tuple[str, float]] = []
+        self.first_update: Optional[float] = None
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def mark_first_update(self):
+        if self.first_update is None:
+            self.first_update = time.perf_counter() - self.started
+            logger.info(f"Time to first update: {self.first_update * 1000:.0f} ms")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'phases_ms': {name: round(duration * 1000, 1) for name, duration in self.phases},
+            'total_ms': round((self.last - self.started) * 1000, 1),
+            'first_update_ms': round(self.first_update * 1000, 1) if self.first_update is not None else None,
+        }
+
+    def report(self):
+        phases = ', '.join(f"{name} {duration * 1000:.0f} ms" for name, duration in self.phases)
+        logger.info(f"Startup profile: {phases}; total {(self.last - self.started) * 1000:.0f} ms")
+
+
+profile = StartupProfile()
@@ -0,0 +1,86 @@
+"""Бенчмарк холодного старта бота
+
+Запускает `python bot.py` с STARTUP_BENCH=1 несколько раз: бот проходит
+все фазы запуска до начала polling с сессией-заглушкой вместо Telegram,
+обрабатывает синтетический /start через диспетчер, печатает профиль и
+выходит. Google Sheets и прогрев кэша медиа в этом режиме не запускаются. Выводит медианы по фазам, first_update_ms (от старта до
+начала обработки первого апдейта) и время процесса целиком, с запуском
+интерпретатора и завершением. Удаление вебхука и сетевые задержки
+в замер не входят.
+
+    python startup_bench.py --runs 10 --output startup_bench.jsonl
+
+С --output результат дописывается строкой JSON с ревизией git, чтобы
+сравнивать релизы между собой.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_once(data_dir: str) -> dict:
+    env = dict(os.environ, STARTUP_BENCH='1', PYTHONDONTWRITEBYTECODE='1')
+    # Токен только проходит проверку формата, к Telegram бот не обращается
+    env.setdefault('BOT_TOKEN', '123456:bench')
+    # Файлы, которые пишет обработка /start, - во временном каталоге
+    env.update(
+        FUNNEL_LOG_PATH=os.path.join(data_dir, 'funnel_events.bin'),
+        LEAD_SPOOL_PATH=os.path.join(data_dir, 'leads_spool.jsonl'),
+        MEDIA_CACHE_PATH=os.path.join(data_dir, 'media_cache.json'),
+    )
+
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, 'bot.py'], cwd=HERE, env=env,
+                            capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    profile = json.loads(result.stdout.strip().splitlines()[-1])
+    profile['process_ms'] = round(wall_ms, 1)
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--output', help='JSONL-файл для истории результатов')
+    args = parser.parse_args()
+
+    # Первый запуск прогревает кэш байткода и файловой системы;
+    # кэш file_id не сохраняется между запусками, как при первом старте
+    run_once(tempfile.mkdtemp(prefix='startup_bench_'))
+    runs = [run_once(tempfile.mkdtemp(prefix='startup_bench_')) for _ in range(args.runs)]
+
+    phases = {name: statistics.median(run['phases_ms'][name] for run in runs)
+              for name in runs[0]['phases_ms']}
+    summary = {
+        'phases_ms': phases,
+        'total_ms': statistics.median(run['total_ms'] for run in runs),
+        'first_update_ms': statistics.median(run['first_update_ms'] for run in runs),
+        'process_ms': statistics.median(run['process_ms'] for run in runs),
+    }
+
+    for name, duration in phases.items():
+        print(f"{name:<12} {duration:8.1f} ms")
+    print(f"{'total':<12} {summary['total_ms']:8.1f} ms")
+    print(f"{'first update':<12} {summary['first_update_ms']:8.1f} ms")
+    print(f"{'process':<12} {summary['process_ms']:8.1f} ms")
+
+    if args.output:
+        revision = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=HERE,
+                                  capture_output=True, text=True).stdout.strip()
+        record = dict(summary, revision=revision, runs=args.runs,
+                      python=sys.version.split()[0], date=datetime.now().isoformat(timespec='seconds'))
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
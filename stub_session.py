@@ -0,0 +1,85 @@
+import asyncio
+import time
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, Document, Message, PhotoSize
+
+
+class StubSession(BaseSession):
+    """Сессия aiogram без сети для нагрузочных тестов и бенчмарков
+
+    Каждый запрос к Bot API ждет latency секунд (имитация сети)
+    и возвращает минимальный успешный ответ: Message для методов,
+    которые его возвращают (с file_id для отправленных файлов), иначе True.
+    """
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.requests = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[Any], timeout: Optional[int] = None) -> Any:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method.__returning__ is not Message:
+            return True
+
+        chat_id = getattr(method, 'chat_id', 0)
+        media = {}
+        file_id = f"stub-{self.requests}"
+        if getattr(method, 'photo', None) is not None:
+            media['photo'] = [PhotoSize(file_id=file_id, file_unique_id=file_id, width=1, height=1)]
+        elif getattr(method, 'document', None) is not None:
+            media['document'] = Document(file_id=file_id, file_unique_id=file_id)
+        return Message(message_id=self.requests, date=int(time.time()),
+                       chat=Chat(id=chat_id if isinstance(chat_id, int) else 0, type='private'), **media)
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b''
+
+    async def close(self):
+        pass
+
+
+def _user(user_id: int) -> Dict[str, Any]:
+    return {'id': user_id, 'is_bot': False, 'first_name': f"User {user_id}"}
+
+
+def message_update(update_id: int, user_id: int, text: str) -> Dict[str, Any]:
+    """Сырой апдейт с текстовым сообщением пользователя в личном чате"""
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': _user(user_id),
+        'text': text,
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return {'update_id': update_id, 'message': message}
+
+
+def callback_update(update_id: int, user_id: int, data: str, bot_id: int) -> Dict[str, Any]:
+    """Сырой апдейт с нажатием inline-кнопки под сообщением бота"""
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': _user(user_id),
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': 1,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': {'id': bot_id, 'is_bot': True, 'first_name': 'Bot'},
+                'text': '...',
+            },
+        },
+    }
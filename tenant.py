@@ -0,0 +1,132 @@
+import importlib
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.types import TelegramObject
+
+from config import (BOT_TOKEN, ADMIN_IDS, TENANTS_CONFIG, GOOGLE_CREDENTIALS_PATH, GOOGLE_SPREADSHEET_NAME,
+                    FUNNEL_LOG_PATH, MEDIA_CACHE_PATH, TEMPLATES_DIR, WELCOME_IMAGE_PATH,
+                    MEDIA_PREWARM_CHAT_ID, WORKERS)
+from funnel import FunnelLog
+from google_sheets import SheetsService, LEAD_SPOOL_PATH, SHARED_INDEX_TTL
+from media import MediaLibrary
+
+logger = logging.getLogger(__name__)
+
+
+class Tenant:
+    """Один бот (бренд/регион) со своими текстами, таблицей, админами и состоянием
+
+    HTTP-сессия, пул потоков и FSM-хранилище общие для всех ботов процесса.
+    """
+
+    def __init__(self, name: str, bot: Bot, admin_ids: List[int], texts: str,
+                 sheets: SheetsService, funnel: FunnelLog, media: MediaLibrary,
+                 prewarm_chat_id: int = 0):
+        self.name = name
+        self.bot = bot
+        self.admin_ids = admin_ids
+        self.texts = importlib.import_module(texts)
+        self.sheets = sheets
+        self.funnel = funnel
+        self.media = media
+        self.prewarm_chat_id = prewarm_chat_id
+        # db :) нужно поменять на psql
+        self.user_data: Dict[int, Dict[str, Any]] = {}
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self.admin_ids
+
+    def track(self, user_id: int, event: str, segment: Optional[str] = None):
+        """Запись события воронки с сегментом пользователя"""
+        if segment is None:
+            segment = self.user_data.get(user_id, {}).get('segment')
+        self.funnel.track(user_id, event, segment)
+
+
+def create_tenant(config: Dict[str, Any], session: AiohttpSession, shard: Optional[int] = None) -> Tenant:
+    """Создание бота по записи из TENANTS_CONFIG
+
+    Файлы бота (воронка, кэш file_id, очередь лидов) хранятся
+    в data_dir, по умолчанию data/<name>.
+    """
+    name = config['name']
+    data_dir = config.get('data_dir', os.path.join('data', name))
+    os.makedirs(data_dir, exist_ok=True)
+
+    admin_ids = [int(x) for x in config.get('admin_ids', [])]
+
+    media = MediaLibrary(os.path.join(data_dir, 'media_cache.json'))
+    media.register('welcome', config.get('welcome_image', WELCOME_IMAGE_PATH), kind='photo')
+    media.register_dir('template', config.get('templates_dir', TEMPLATES_DIR))
+
+    return Tenant(
+        name=name,
+        bot=Bot(token=config['token'], session=session),
+        admin_ids=admin_ids,
+        texts=config.get('texts', 'texts'),
+        sheets=SheetsService(
+            config.get('credentials_path', GOOGLE_CREDENTIALS_PATH),
+            config.get('spreadsheet', GOOGLE_SPREADSHEET_NAME),
+            spool_path=os.path.join(data_dir, 'leads_spool.jsonl'),
+            name=f"google_sheets:{name}",
+            index_ttl=SHARED_INDEX_TTL if shard is not None else 0,
+            shard=shard,
+            workers=WORKERS,
+        ),
+        funnel=FunnelLog(os.path.join(data_dir, 'funnel_events.bin'), shard=shard),
+        media=media,
+        prewarm_chat_id=int(config.get('prewarm_chat_id', 0)) or (admin_ids[0] if admin_ids else 0),
+    )
+
+
+def load_tenants(session: AiohttpSession, shard: Optional[int] = None) -> List[Tenant]:
+    """Загрузка ботов из TENANTS_CONFIG или одного бота из переменных окружения
+
+    shard - номер воркера в многопроцессном режиме, файлы с записью
+    из нескольких процессов получают суффикс воркера.
+    """
+    if TENANTS_CONFIG:
+        with open(TENANTS_CONFIG, encoding='utf-8') as f:
+            configs = json.load(f)
+        tenants = [create_tenant(config, session, shard) for config in configs]
+        logger.info(f"Loaded {len(tenants)} tenants: {', '.join(t.name for t in tenants)}")
+        return tenants
+
+    media = MediaLibrary(MEDIA_CACHE_PATH)
+    media.register('welcome', WELCOME_IMAGE_PATH, kind='photo')
+    media.register_dir('template', TEMPLATES_DIR)
+
+    return [Tenant(
+        name='default',
+        bot=Bot(token=BOT_TOKEN, session=session),
+        admin_ids=ADMIN_IDS,
+        texts='texts',
+        sheets=SheetsService(GOOGLE_CREDENTIALS_PATH, GOOGLE_SPREADSHEET_NAME,
+                             spool_path=LEAD_SPOOL_PATH,
+                             index_ttl=SHARED_INDEX_TTL if shard is not None else 0,
+                             shard=shard, workers=WORKERS),
+        funnel=FunnelLog(FUNNEL_LOG_PATH, shard=shard),
+        media=media,
+        prewarm_chat_id=MEDIA_PREWARM_CHAT_ID,
+    )]
+
+
+class TenantMiddleware(BaseMiddleware):
+    """Передает в хендлеры tenant бота, получившего апдейт"""
+
+    def __init__(self, tenants: List[Tenant]):
+        self.tenants = {tenant.bot.id: tenant for tenant in tenants}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        data['tenant'] = self.tenants[data['bot'].id]
+        return await handler(event, data)
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время предохранителя"""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def fail():
+    raise RuntimeError('down')
+
+
+def make_breaker(**kwargs):
+    options = dict(failure_rate=0.5, slow_call_seconds=5.0, window=4, min_calls=2, open_seconds=30.0)
+    options.update(kwargs)
+    return CircuitBreaker('test', **options)
+
+
+def test_opens_on_failure_rate(clock):
+    breaker = make_breaker()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_min_calls_before_opening(clock):
+    breaker = make_breaker(min_calls=3)
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == CLOSED
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+
+
+def test_slow_call_counts_as_failure(clock):
+    breaker = make_breaker()
+    breaker.record(True, 6.0)
+    breaker.record(True, 7.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_allows_single_probe(clock):
+    breaker = make_breaker()
+    breaker._open()
+    clock[0] += 29
+    assert not breaker.allow()
+
+    clock[0] += 1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes(clock):
+    breaker = make_breaker()
+    breaker._open()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert not breaker.results
+
+
+def test_failed_or_slow_probe_reopens(clock):
+    breaker = make_breaker()
+    breaker._open()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record(True, 10.0)
+
+    assert breaker.state == OPEN
+    assert breaker.opened_at == clock[0]
+    assert not breaker.allow()
+
+
+def test_call_records_results():
+    async def scenario():
+        breaker = make_breaker()
+        assert await breaker.call(lambda x: x * 2, 21) == 42
+        with pytest.raises(RuntimeError):
+            await breaker.call(fail)
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(lambda: None)
+
+    asyncio.run(scenario())
+
+
+def test_call_timeout_counts_as_failure():
+    async def scenario():
+        breaker = make_breaker(min_calls=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(time.sleep, 0.5, timeout=0.05)
+        assert breaker.state == OPEN
+
+    asyncio.run(scenario())
+
+
+def test_probe_timeout_reopens():
+    async def scenario():
+        breaker = make_breaker(open_seconds=0.01)
+        breaker._open()
+        await asyncio.sleep(0.02)
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(time.sleep, 0.5, timeout=0.05)
+        assert breaker.state == OPEN
+        assert not breaker.probe_in_flight
+
+        await asyncio.sleep(0.02)
+        await breaker.call(lambda: None)
+        assert breaker.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_probe_is_released():
+    async def scenario():
+        breaker = make_breaker(open_seconds=0.01)
+        breaker._open()
+        await asyncio.sleep(0.02)
+        task = asyncio.create_task(breaker.call(time.sleep, 0.2))
+        await asyncio.sleep(0.05)
+        assert breaker.state == HALF_OPEN and breaker.probe_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert not breaker.probe_in_flight
+        assert breaker.allow()
+
+    asyncio.run(scenario())
+
+
+def test_sheets_breakers_do_not_share_threads():
+    from google_sheets import SHEETS_THREADS, make_breaker as make_sheets_breaker
+
+    async def scenario():
+        hung, healthy = make_sheets_breaker('google_sheets:hung'), make_sheets_breaker('google_sheets:healthy')
+        release = threading.Event()
+        # Все потоки одного бота заняты зависшими запросами
+        stuck = [asyncio.ensure_future(hung.call(release.wait)) for _ in range(SHEETS_THREADS)]
+        try:
+            assert await asyncio.wait_for(healthy.call(lambda: 'ok'), 1) == 'ok'
+        finally:
+            release.set()
+            await asyncio.gather(*stuck)
+
+    asyncio.run(scenario())
@@ -0,0 +1,159 @@
+import os
+
+import pytest
+
+import funnel
+from funnel import BLOCK_HEADER, MAGIC, FunnelLog
+
+DAY = 86400
+NOW = 100 * DAY
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время для FunnelLog.track"""
+    now = [NOW]
+    monkeypatch.setattr(funnel.time, 'time', lambda: now[0])
+    return now
+
+
+def columns(log, since=0):
+    return [column.tolist() for column in log.load(since)]
+
+
+def test_round_trip(tmp_path, clock):
+    path = str(tmp_path / 'funnel.bin')
+    log = FunnelLog(path)
+    log.track(1, 'start')
+    log.track(1, 'segment', 'ip')
+    clock[0] += 10
+    log.track(2, 'lead', 'hr')
+    assert log.flush() == 3
+    assert len(log) == 0
+
+    log.track(3, 'faq')
+    log.flush()
+
+    expected = [[NOW, NOW, NOW + 10, NOW + 10], [1, 1, 2, 3],
+                [funnel.EVENTS['start'], funnel.EVENTS['segment'], funnel.EVENTS['lead'], funnel.EVENTS['faq']],
+                [0, funnel.SEGMENTS['ip'], funnel.SEGMENTS['hr'], 0]]
+    assert columns(FunnelLog(path)) == expected
+
+
+def test_load_includes_unflushed_buffer(tmp_path, clock):
+    log = FunnelLog(str(tmp_path / 'funnel.bin'))
+    log.track(1, 'start')
+    log.flush()
+    log.track(2, 'start')
+    assert columns(log)[1] == [1, 2]
+
+
+def test_since_skips_old_blocks(tmp_path, clock):
+    log = FunnelLog(str(tmp_path / 'funnel.bin'))
+    log.track(1, 'start')
+    log.flush()
+    clock[0] += DAY
+    log.track(2, 'start')
+    log.track(3, 'start')
+    log.flush()
+
+    assert columns(log, since=NOW + 1)[1] == [2, 3]
+    assert columns(log, since=NOW + DAY + 1)[1] == []
+
+
+def test_truncated_block_is_skipped(tmp_path, clock):
+    path = str(tmp_path / 'funnel.bin')
+    log = FunnelLog(path)
+    log.track(1, 'start')
+    log.flush()
+    log.track(2, 'start')
+    log.track(3, 'start')
+    log.flush()
+
+    # Процесс упал посреди записи второго блока
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 5)
+    assert columns(FunnelLog(path))[1] == [1]
+
+    # Оборван заголовок блока
+    size = len(MAGIC) + BLOCK_HEADER.size + 14
+    with open(path, 'r+b') as f:
+        f.truncate(size + 3)
+    assert columns(FunnelLog(path))[1] == [1]
+
+
+def test_legacy_file_is_moved_aside(tmp_path, clock):
+    path = str(tmp_path / 'funnel.bin')
+    with open(path, 'wb') as f:
+        f.write(b'FNL1' + b'\0' * 16)
+
+    log = FunnelLog(path)
+    log.track(1, 'start')
+    log.flush()
+
+    assert os.path.exists(path + '.legacy')
+    assert columns(FunnelLog(path))[1] == [1]
+
+
+def test_shards_are_read_together(tmp_path, clock):
+    path = str(tmp_path / 'funnel.bin')
+    for shard in (0, 1):
+        log = FunnelLog(path, shard=shard)
+        log.track(10 + shard, 'start')
+        log.flush()
+
+    assert sorted(columns(FunnelLog(path))[1]) == [10, 11]
+
+
+def test_report_counts_cohorts_with_last_segment(tmp_path, clock):
+    log = FunnelLog(str(tmp_path / 'funnel.bin'))
+    # Пользователь 1 сменил сегмент: все его шаги засчитываются последнему
+    log.track(1, 'segment', 'ip')
+    log.track(1, 'faq', 'ip')
+    log.track(1, 'faq_view', 'ip')
+    log.track(1, 'segment', 'hr')
+    log.track(1, 'lead', 'hr')
+    log.track(2, 'segment', 'ip')
+    log.track(3, 'faq')
+    # Без шагов воронки пользователь в когорты не попадает
+    log.track(4, 'start')
+    clock[0] += DAY
+    # Лид на следующий день засчитывается когорте дня выбора сегмента
+    log.track(2, 'lead', 'ip')
+    log.track(5, 'segment', 'ip')
+    log.flush()
+
+    report = log.report()
+    assert report == {
+        (NOW, 'hr'): {'users': 1, 'segment': 1, 'content': 1, 'lead_form': 0, 'lead': 1},
+        (NOW, 'ip'): {'users': 1, 'segment': 1, 'content': 0, 'lead_form': 0, 'lead': 1},
+        (NOW, 'unknown'): {'users': 1, 'segment': 0, 'content': 1, 'lead_form': 0, 'lead': 0},
+        (NOW + DAY, 'ip'): {'users': 1, 'segment': 1, 'content': 0, 'lead_form': 0, 'lead': 0},
+    }
+    # Начало периода отрезает первые шаги, когорта считается по тому, что в него попало
+    assert log.report(since=NOW + DAY) == {
+        (NOW + DAY, 'ip'): {'users': 2, 'segment': 1, 'content': 0, 'lead_form': 0, 'lead': 1},
+    }
+    assert FunnelLog(str(tmp_path / 'empty.bin')).report() == {}
+
+
+def test_format_report_uses_cohort_size_as_base():
+    report = {(NOW, 'ip'): {'users': 4, 'segment': 2, 'content': 1, 'lead_form': 1, 'lead': 1}}
+    assert funnel.format_report(report) == ['1970-04-11 ip: 4 → 2 → 1 → 1 → 1 (25.0%)']
+
+
+def test_full_buffer_signals_instead_of_flushing(tmp_path, clock):
+    path = str(tmp_path / 'funnel.bin')
+    log = FunnelLog(path, capacity=2)
+    signals = []
+    log.on_full = lambda: signals.append(len(log))
+
+    for user_id in range(4):
+        log.track(user_id, 'start')
+    assert signals == [2]
+    assert len(log) == 4 and not os.path.exists(path)
+
+    log.flush()
+    log.track(5, 'start')
+    log.track(6, 'start')
+    assert signals == [2, 2]
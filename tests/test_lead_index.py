@@ -0,0 +1,109 @@
+from lead_index import LeadIndex, normalize_phone
+
+
+def lead(name, phone='', username='', user_id=''):
+    return {'name': name, 'phone': phone, 'username': username, 'user_id': user_id, 'status': 'Новый'}
+
+
+def names(leads):
+    return [item['name'] for item in leads]
+
+
+def test_normalize_phone():
+    assert normalize_phone('+7 (999) 123-45-67') == '79991234567'
+    assert normalize_phone('8 999 123 45 67') == '79991234567'
+    assert normalize_phone(79991234567) == '79991234567'
+
+
+def test_add_and_search():
+    index = LeadIndex()
+    index.add(2, lead('Анна', '+7 999 000-00-01', '@anna', 101))
+    index.add(3, lead('Борис', '89990000002', 'boris', 102))
+
+    assert names(index.search('+7 999 000 00 02')) == ['Борис']
+    assert names(index.search('101')) == ['Анна']
+    assert names(index.search('@Bor')) == ['Борис']
+    assert names(index.search('ан')) == ['Анна']
+    assert names(index.search('an')) == ['Анна']
+    assert index.search('') == []
+    assert index.search('Виктор') == []
+    assert index.find_by_phone('8 999 000 00 01')[0]['row'] == 2
+
+
+def test_search_returns_newest_matches_first():
+    index = LeadIndex()
+    for i in range(1, 20001):
+        index.add(i + 1, lead(f'name{i}'))
+
+    # Раньше бралось первое по алфавиту (name1, name10, name100, ...)
+    assert names(index.search('Name1', limit=3)) == ['name19999', 'name19998', 'name19997']
+    assert names(index.search('name2', limit=2)) == ['name20000', 'name2999']
+
+
+def test_search_deduplicates_name_and_username_matches():
+    index = LeadIndex()
+    index.add(2, lead('max', username='max'))
+    assert names(index.search('max')) == ['max']
+
+
+def test_remove():
+    index = LeadIndex()
+    index.add(2, lead('Анна', '79990000001', 'anna', 101))
+    index.add(3, lead('Анна', '79990000001', 'anna2', 102))
+    index.remove(2)
+
+    assert len(index) == 1
+    assert [item['row'] for item in index.find_by_phone('79990000001')] == [3]
+    assert index.search('101') == []
+    assert index.search('@anna') == [index.leads[3]]
+    assert index.names.keys == [('анна', 3)] and index.names.prefixes['ан'] == [3]
+
+    index.remove(3)
+    index.remove(3)
+    assert not index.by_phone and not index.by_user_id and not index.names and not index.usernames
+    assert not index.names.prefixes and not index.names.by_row
+
+
+def test_add_replaces_row():
+    index = LeadIndex()
+    index.add(2, lead('Анна', '79990000001'))
+    index.add(2, lead('Борис', '79990000002'))
+
+    assert names(index.search('анна')) == []
+    assert names(index.search('79990000002')) == ['Борис']
+    assert index.find_by_phone('79990000001') == []
+
+
+def test_set_status():
+    index = LeadIndex()
+    index.add(2, lead('Анна'))
+    assert index.set_status(2, 'Закрыт')['status'] == 'Закрыт'
+    assert index.set_status(5, 'Закрыт') is None
+
+
+def test_from_rows_matches_incremental_add():
+    rows = [(i + 2, lead(f'name{i * 7919 % 1000}', f'7999{i:07d}', f'user{i * 31 % 1000}', i)) for i in range(1000)]
+    added = LeadIndex()
+    for row, item in rows:
+        added.add(row, item)
+    built = LeadIndex.from_rows(rows)
+
+    assert built.leads == added.leads
+    assert built.by_phone == added.by_phone and built.by_user_id == added.by_user_id
+    assert built.names.keys == added.names.keys and built.names.prefixes == added.names.prefixes
+    assert built.usernames.keys == added.usernames.keys and built.usernames.prefixes == added.usernames.prefixes
+
+
+def test_prefix_search_matches_full_scan():
+    index = LeadIndex()
+    keys = {}
+    for i in range(3000):
+        keys[i + 2] = f"{'ab'[i % 2]}{'abc'[i * 7 % 3]}{i * 7919 % 1000}"
+        index.add(i + 2, lead(keys[i + 2]))
+    for row in range(2, 3002, 5):
+        index.remove(row)
+        del keys[row]
+
+    for prefix in ('a', 'ab', 'bc1', 'ab1', 'ab12', 'ba99', 'abc'):
+        expected = sorted((row for row, key in keys.items() if key.startswith(prefix)), reverse=True)[:7]
+        assert index.names.search(prefix, 7) == expected
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from google_sheets import GoogleSheetsManager, SheetsService
+
+HEADERS = ['Дата/Время', 'Имя', 'Телефон', 'Сегмент', 'Действие', 'Username', 'User ID', 'Статус', 'Примечания']
+
+
+class FakeWorksheet:
+    """Лист Google Sheets в памяти"""
+
+    def __init__(self):
+        self.rows = []
+
+    def append_row(self, row):
+        self.rows.append(row)
+        return {'updates': {'updatedRange': f"Sheet1!A{len(self.rows) + 1}:I{len(self.rows) + 1}"}}
+
+    def get_all_records(self):
+        return [dict(zip(HEADERS, row)) for row in self.rows]
+
+
+def make_service(tmp_path, shard=None, workers=1):
+    service = SheetsService('missing.json', 'Leads', spool_path=str(tmp_path / 'spool.jsonl'),
+                            shard=shard, workers=workers)
+    manager = GoogleSheetsManager('missing.json', 'Leads', service.breaker)
+    manager.worksheet = FakeWorksheet()
+    service.manager = manager
+    return service
+
+
+def write_spool(path, *names):
+    with open(path, 'w', encoding='utf-8') as f:
+        for name in names:
+            f.write(json.dumps({'created_at': '2026-01-01 10:00:00', 'name': name, 'phone': '79990000000'}) + '\n')
+
+
+def sent_names(service):
+    return sorted(row[1] for row in service.manager.worksheet.rows)
+
+
+def test_worker_zero_replays_spools_of_removed_workers(tmp_path):
+    base = tmp_path / 'spool.jsonl'
+    write_spool(f"{base}.0", 'own')
+    write_spool(f"{base}.1", 'live worker')
+    write_spool(f"{base}.2", 'removed')
+    write_spool(f"{base}.3.replay", 'interrupted replay')
+    write_spool(base, 'single process')
+
+    service = make_service(tmp_path, shard=0, workers=2)
+    assert asyncio.run(service.replay_spool()) == 4
+
+    assert sent_names(service) == ['interrupted replay', 'own', 'removed', 'single process']
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['spool.jsonl.1']
+
+
+def test_single_process_replays_all_worker_spools(tmp_path):
+    base = tmp_path / 'spool.jsonl'
+    write_spool(f"{base}.0", 'a')
+    write_spool(f"{base}.5", 'b')
+
+    service = make_service(tmp_path)
+    assert asyncio.run(service.replay_spool()) == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_other_workers_do_not_adopt(tmp_path):
+    write_spool(f"{tmp_path / 'spool.jsonl'}.3", 'removed')
+    assert make_service(tmp_path, shard=1, workers=2).orphan_spools() == []
+
+
+def test_unsent_orphan_leads_move_to_own_spool(tmp_path, monkeypatch):
+    base = tmp_path / 'spool.jsonl'
+    write_spool(f"{base}.2", 'first', 'second')
+
+    service = make_service(tmp_path, shard=0, workers=1)
+
+    async def add_lead(lead_data):
+        return False
+
+    monkeypatch.setattr(service.manager, 'add_lead', add_lead)
+    assert asyncio.run(service.replay_spool()) == 0
+
+    with open(f"{base}.0", encoding='utf-8') as f:
+        assert [json.loads(line)['name'] for line in f] == ['first', 'second']
+    assert not (tmp_path / 'spool.jsonl.2').exists()
+
+
+def test_index_rebuild_keeps_leads_added_meanwhile(tmp_path):
+    service = make_service(tmp_path)
+    manager = service.manager
+    records = [{'Имя': 'old', 'Телефон': '79990000001'}]
+    # Лид записан в строку 3, пока индекс строился по одной прочитанной строке
+    manager.index.add(3, {'name': 'new', 'phone': '79990000002'})
+    asyncio.run(manager.load_index(records))
+
+    assert sorted(lead['name'] for lead in manager.index.leads.values()) == ['new', 'old']
+    assert manager.index.find_by_phone('79990000002')[0]['row'] == 3
@@ -182,4 +182,54 @@ EXIT_TEXT = """👋 <b>До свидания!</b>
 
 🔄 Чтобы вернуться в меню, напишите /start
 
-Удачи в бизнесе! 🚀"""
\ No newline at end of file
+Удачи в бизнесе! 🚀"""
+
+STATS_TITLE = "📊 <b>Статистика лидов SignContract</b>"
+
+# Подписи в /stats: код -> (эмодзи, название)
+SEGMENT_LABELS = {
+    'ip': ('👨‍💼', 'Индивидуальный Предприниматель'),
+    'lawyer': ('⚖️', 'Юристы'),
+    'hr': ('👥', 'HR'),
+    'other': ('🔄', 'Другие'),
+}
+
+ACTION_LABELS = {
+    'template': ('📄', 'Шаблоны'),
+    'demo': ('🎯', 'Демо'),
+}
+
+# Кнопки клавиатур: callback_data -> текст кнопки
+SEGMENT_BUTTONS = {
+    'segment_ip': "👨‍💼 Я Индивидуальный Предприниматель",
+    'segment_lawyer': "⚖️ Я юрист",
+    'segment_hr': "👥 Я HR-специалист",
+    'segment_other': "🔄 Другое",
+}
+
+MAIN_MENU_BUTTONS = {
+    'how_it_works': "❓ Как это работает?",
+    'case_studies': "💼 Примеры клиентов",
+    'faq': "🤔 Ответы на вопросы",
+    'get_template': "📄 Получить шаблон договора",
+    'order_demo': "🎯 Заказать демонстрацию",
+    'exit': "❌ Выйти",
+}
+
+CASE_STUDIES_BUTTONS = {
+    'case_education': "🎓 Образование",
+    'case_realestate': "🏠 Недвижимость",
+    'case_services': "💼 Услуги",
+    'back_to_menu': "⬅️ Назад",
+}
+
+FAQ_BUTTONS = {
+    'faq_legal': "⚖️ Законно ли это?",
+    'faq_ecp': "🔐 Нужна ли ЭЦП?",
+    'faq_security': "🛡 Безопасно ли?",
+    'back_to_menu': "⬅️ Назад",
+}
+
+BACK_BUTTONS = {
+    'back_to_menu': "⬅️ Назад в меню",
+}